@@ -0,0 +1,150 @@
+"""
+Admission control for the scoring endpoints of serve_model.py.
+
+Under a burst the server should shed work quickly instead of letting
+requests queue until clients time out. AdmissionController combines:
+
+- a concurrency limit: at most `max_concurrent` requests score at once
+- a bounded wait queue: up to `max_queue` more wait for a slot; beyond
+  that requests are rejected at once (503 with Retry-After)
+- per-client token buckets: `rate` requests/s with bursts of `burst`
+  (429 with Retry-After), at most `max_clients` of them, least recently
+  used evicted first
+- deadlines: a request carries its remaining budget in an
+  X-Request-Deadline-Ms header (or gets `default_deadline_ms`); it is
+  dropped (504 with Retry-After) if the budget runs out while waiting or
+  before scoring; a malformed header gets 400
+"""
+import collections
+import math
+import threading
+import time
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after=None):
+        Exception.__init__(self, reason)
+        self.status = status
+        self.retry_after = retry_after
+
+class TokenBucket(object):
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time() if now is None else now
+
+    def take(self, now):
+        """Takes one token; returns 0 on success, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+class AdmissionController(object):
+    def __init__(self, max_concurrent=4, max_queue=16, rate=None, burst=None,
+                 default_deadline_ms=None, max_clients=10000):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst or (rate and max(1, int(rate)))
+        self.default_deadline_ms = default_deadline_ms
+        self.max_clients = max_clients
+        self.buckets = collections.OrderedDict()
+        self.condition = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+        # Smoothed service time, used for Retry-After hints
+        self.service_time = 0.01
+        self.counts = {'admitted': 0, 'queue_full': 0, 'rate_limited': 0, 'expired': 0}
+
+    def deadline(self, header_value):
+        """Absolute deadline for a request from its X-Request-Deadline-Ms header."""
+        budget_ms = self.default_deadline_ms
+        if header_value:
+            try:
+                budget_ms = float(header_value)
+            except ValueError:
+                budget_ms = None
+            if budget_ms is None or math.isnan(budget_ms) or math.isinf(budget_ms):
+                raise Rejected(400, "X-Request-Deadline-Ms must be a number of milliseconds")
+        return time.time() + budget_ms / 1000.0 if budget_ms is not None else None
+
+    def acquire(self, client, deadline=None):
+        """Blocks until the request may run; raises Rejected otherwise."""
+        now = time.time()
+        with self.condition:
+            if self.rate:
+                # Most recently used last, so eviction takes the front
+                bucket = self.buckets.pop(client, None)
+                if bucket is None:
+                    if len(self.buckets) >= self.max_clients:
+                        self._forget_idle_clients(now)
+                    while len(self.buckets) >= self.max_clients:
+                        self.buckets.popitem(last=False)
+                    # Stamped with the same `now` as take(), or a new client's
+                    # first request could find its full bucket short of a token
+                    bucket = TokenBucket(self.rate, self.burst, now)
+                self.buckets[client] = bucket
+                wait = bucket.take(now)
+                if wait:
+                    self.counts['rate_limited'] += 1
+                    raise Rejected(429, "rate limit exceeded", int(math.ceil(wait)))
+
+            if self.running >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.counts['queue_full'] += 1
+                    raise Rejected(503, "server overloaded", self._retry_after())
+                self.waiting += 1
+                try:
+                    while self.running >= self.max_concurrent:
+                        timeout = None if deadline is None else deadline - time.time()
+                        if timeout is not None and timeout <= 0:
+                            self.counts['expired'] += 1
+                            raise Rejected(504, "deadline exceeded while queued",
+                                           self._retry_after())
+                        self.condition.wait(timeout)
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+            self.counts['admitted'] += 1
+        return time.time()
+
+    def check_deadline(self, deadline):
+        """Raises Rejected if `deadline` passed; call right before scoring."""
+        if deadline is not None and time.time() >= deadline:
+            with self.condition:
+                self.counts['expired'] += 1
+                retry_after = self._retry_after()
+            raise Rejected(504, "deadline exceeded before scoring", retry_after)
+
+    def release(self, started):
+        with self.condition:
+            self.running -= 1
+            self.service_time = 0.9 * self.service_time + 0.1 * (time.time() - started)
+            self.condition.notify()
+
+    def _retry_after(self):
+        # Time for the current queue to drain, at least one second
+        drain = (self.waiting + self.running) * self.service_time / self.max_concurrent
+        return max(1, int(math.ceil(drain)))
+
+    def _forget_idle_clients(self, now):
+        # Buckets that have refilled carry no state worth keeping
+        for client, bucket in list(self.buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * self.rate >= bucket.burst:
+                del self.buckets[client]
+
+    def stats(self):
+        with self.condition:
+            stats = dict(self.counts)
+            stats.update({
+                'running': self.running,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'clients': len(self.buckets),
+                'service_time_ms': self.service_time * 1000
+            })
+            return stats
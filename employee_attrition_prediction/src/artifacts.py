@@ -0,0 +1,42 @@
+"""
+Reading model_artifacts.json and the sparse (pruned) coefficient layout.
+
+Shared by the Python 2 training and serving code (through train_model) and
+the Python 3 dashboard, so it must stay valid under both.
+"""
+import json
+import sys
+
+_TEXT = type(u'')
+
+def _to_utf8(value):
+    if isinstance(value, dict):
+        return dict((_to_utf8(k), _to_utf8(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_to_utf8(v) for v in value]
+    if isinstance(value, _TEXT):
+        return value.encode('utf-8')
+    return value
+
+def prune_coefficients(coefficients):
+    """Returns (indices, weights) of the non-zero coefficients."""
+    active = [i for i, c in enumerate(coefficients) if c != 0.0]
+    return active, [coefficients[i] for i in active]
+
+def load_model_artifacts(filename):
+    """
+    Reads model_artifacts.json. Pruned (L1) artifacts are expanded so
+    'coefficients' is always the dense list matching 'features'.
+    """
+    with open(filename, 'r') as f:
+        artifacts = json.load(f)
+    if sys.version_info[0] == 2 and artifacts.get('encoder') is not None:
+        # json gives unicode, but CSV fields are UTF-8 byte strings and a
+        # non-ASCII unicode value never equals them
+        artifacts['encoder'] = _to_utf8(artifacts['encoder'])
+    if 'coefficients' not in artifacts:
+        coefficients = [0.0] * len(artifacts['features'])
+        for i, w in zip(artifacts['active'], artifacts['weights']):
+            coefficients[i] = w
+        artifacts['coefficients'] = coefficients
+    return artifacts
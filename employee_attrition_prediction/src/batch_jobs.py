@@ -0,0 +1,256 @@
+"""
+Background batch scoring jobs for serve_model.py.
+
+A job scores a whole HR extract (CSV with the training column names) in a
+separate worker process, so interactive /predict requests never compete
+with it for the interpreter lock. The worker streams the file in chunks
+through the encoder saved in model_artifacts.json and the server's batch
+scorer, writes `<jobs_dir>/<job_id>.csv`, and checks for cancellation
+between chunks.
+
+Inputs named by path must resolve inside `data_dir` (no path inputs without
+one); uploads are streamed to disk and capped at `max_upload_bytes`.
+Finished jobs and their files are removed `ttl_seconds` after they end.
+"""
+import csv
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+from train_model import transform_row
+
+class Job(object):
+    def __init__(self, job_id, input_path, output_path, id_column=None, uploaded=False):
+        self.job_id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.id_column = id_column
+        # Uploaded inputs belong to the job and are deleted with it
+        self.uploaded = uploaded
+        self.status = 'queued'
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.rows = multiprocessing.Value('l', 0)
+        self.fraction = multiprocessing.Value('d', 0.0)
+        self.cancel_event = multiprocessing.Event()
+        self.process = None
+
+    def to_dict(self):
+        info = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'input': self.input_path,
+            'rows_scored': self.rows.value,
+            'progress': round(self.fraction.value, 4),
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == 'done':
+            info['output'] = self.output_path
+        if self.error:
+            info['error'] = self.error
+        return info
+
+def _counting_lines(f, counter):
+    # Tracks bytes consumed so progress can be reported as a fraction
+    for line in f:
+        counter[0] += len(line)
+        yield line
+
+def _score_file(job, encoder, predict_batch, chunk_size):
+    """Worker process body: stream, encode, score and write one file."""
+    os.nice(10)
+    tmp_path = job.output_path + '.tmp'
+    total_bytes = float(os.path.getsize(job.input_path)) or 1.0
+    consumed = [0]
+    try:
+        with open(job.input_path, 'rb') as f_in, open(tmp_path, 'wb') as f_out:
+            reader = csv.reader(_counting_lines(f_in, consumed))
+            headers = next(reader)
+            positions = [headers.index(col['name']) for col in encoder['columns']]
+            id_pos = headers.index(job.id_column) if job.id_column else None
+
+            writer = csv.writer(f_out)
+            writer.writerow(['row'] + ([job.id_column] if job.id_column else []) +
+                            ['probability', 'prediction'])
+
+            row_number = 0
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) < chunk_size:
+                    continue
+                row_number = _write_chunk(writer, chunk, row_number, positions, id_pos,
+                                          encoder, predict_batch)
+                chunk = []
+                job.rows.value = row_number
+                job.fraction.value = consumed[0] / total_bytes
+                if job.cancel_event.is_set():
+                    break
+            else:
+                row_number = _write_chunk(writer, chunk, row_number, positions, id_pos,
+                                          encoder, predict_batch)
+                job.rows.value = row_number
+                job.fraction.value = 1.0
+
+        if job.cancel_event.is_set():
+            os.remove(tmp_path)
+            os._exit(2)
+        os.rename(tmp_path, job.output_path)
+    except Exception as e:
+        with open(job.output_path + '.error', 'w') as f:
+            f.write(str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        os._exit(1)
+
+def _write_chunk(writer, chunk, row_number, positions, id_pos, encoder, predict_batch):
+    vectors = [transform_row(encoder, [row[p] for p in positions]) for row in chunk]
+    probs = predict_batch(vectors)
+    for row, prob in zip(chunk, probs):
+        out = [row_number]
+        if id_pos is not None:
+            out.append(row[id_pos])
+        out.extend([prob, 1 if prob >= 0.5 else 0])
+        writer.writerow(out)
+        row_number += 1
+    return row_number
+
+class JobManager(object):
+    """
+    Queues batch scoring jobs and runs up to `workers` of them at a time,
+    each in its own process. `predict_batch` takes a list of encoded
+    vectors and returns their probabilities.
+    """
+
+    def __init__(self, encoder, predict_batch, jobs_dir='jobs', workers=1, chunk_size=1000,
+                 data_dir=None, max_upload_bytes=100 * 1024 * 1024, ttl_seconds=3600):
+        self.encoder = encoder
+        self.predict_batch = predict_batch
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.data_dir = os.path.realpath(data_dir) if data_dir else None
+        self.max_upload_bytes = max_upload_bytes
+        self.ttl_seconds = ttl_seconds
+        self.jobs = {}
+        self.queue = []
+        self.lock = threading.Lock()
+        if not os.path.isdir(jobs_dir):
+            os.makedirs(jobs_dir)
+
+        scheduler = threading.Thread(target=self._schedule_loop)
+        scheduler.daemon = True
+        scheduler.start()
+
+    def resolve_input(self, input_path):
+        """Absolute path of an input under data_dir; ValueError for anything else."""
+        if self.data_dir is None:
+            raise ValueError("file inputs are disabled; upload the CSV or start the server "
+                             "with --jobs-data-dir")
+        if not input_path:
+            raise ValueError("no input file given")
+        path = os.path.realpath(os.path.join(self.data_dir, input_path))
+        if not path.startswith(self.data_dir + os.sep):
+            raise ValueError("input must be inside the data directory: {}".format(input_path))
+        if not os.path.isfile(path):
+            raise ValueError("input file not found: {}".format(input_path))
+        return path
+
+    def submit(self, input_path=None, upload=None, upload_bytes=None, id_column=None):
+        """
+        Queues a job for `input_path` (relative to data_dir) or an upload:
+        a file object with `upload_bytes` bytes to read, copied to disk in
+        blocks so large extracts never sit in memory.
+        """
+        if self.encoder is None:
+            raise ValueError("model_artifacts.json has no encoder; retrain to enable batch jobs")
+        job_id = uuid.uuid4().hex[:12]
+        if upload is not None:
+            if upload_bytes > self.max_upload_bytes:
+                raise ValueError("upload of {} bytes exceeds the {} byte limit".format(
+                    upload_bytes, self.max_upload_bytes))
+            input_path = os.path.join(self.jobs_dir, job_id + '.input.csv')
+            with open(input_path, 'wb') as f:
+                remaining = upload_bytes
+                while remaining > 0:
+                    block = upload.read(min(remaining, 1 << 16))
+                    if not block:
+                        break
+                    f.write(block)
+                    remaining -= len(block)
+        else:
+            input_path = self.resolve_input(input_path)
+        job = Job(job_id, input_path, os.path.join(self.jobs_dir, job_id + '.csv'), id_column,
+                  uploaded=upload is not None)
+        with self.lock:
+            self.jobs[job_id] = job
+            self.queue.append(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            self._reap()
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == 'queued':
+                self.queue.remove(job)
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+            elif job.status == 'running':
+                job.cancel_event.set()
+            return job
+
+    def _expire(self, now):
+        # Finished jobs are kept for polling and download, then forgotten
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is None or now - job.finished_at < self.ttl_seconds:
+                continue
+            del self.jobs[job_id]
+            paths = [job.output_path] + ([job.input_path] if job.uploaded else [])
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _reap(self):
+        for job in self.jobs.values():
+            if job.status != 'running' or job.process.is_alive():
+                continue
+            job.process.join()
+            job.finished_at = time.time()
+            if job.process.exitcode == 0:
+                job.status = 'done'
+            elif job.process.exitcode == 2:
+                job.status = 'cancelled'
+            else:
+                job.status = 'failed'
+                error_path = job.output_path + '.error'
+                if os.path.exists(error_path):
+                    with open(error_path) as f:
+                        job.error = f.read()
+                    os.remove(error_path)
+
+    def _schedule_loop(self):
+        while True:
+            with self.lock:
+                self._reap()
+                self._expire(time.time())
+                running = sum(1 for job in self.jobs.values() if job.status == 'running')
+                while self.queue and running < self.workers:
+                    job = self.queue.pop(0)
+                    job.process = multiprocessing.Process(
+                        target=_score_file,
+                        args=(job, self.encoder, self.predict_batch, self.chunk_size))
+                    job.process.daemon = True
+                    job.process.start()
+                    job.status = 'running'
+                    running += 1
+            time.sleep(0.1)
@@ -0,0 +1,74 @@
+"""
+Throughput/latency trade-off of the /predict request coalescer.
+
+Simulates concurrent single-record callers in-process (no HTTP) and scores
+them either one at a time or through RequestCoalescer at several window
+sizes. The batch scorer is the same per-row Python loop, so expect the
+coalescer to lose throughput and add roughly its window to every request;
+the benchmark is for measuring scorers with a real per-call cost. Run from
+src/ after train_model.py:
+
+    python benchmark_coalescer.py --clients 16 --requests 500
+"""
+import argparse
+import random
+import threading
+import time
+
+import serve_model
+from coalescer import RequestCoalescer
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))
+    return ordered[idx]
+
+def run_clients(predict, rows, n_clients, n_requests):
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(idx):
+        for _ in range(n_requests):
+            row = rows[random.randint(0, len(rows) - 1)]
+            start = time.time()
+            predict(row)
+            latencies[idx].append(time.time() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    flat = [l for per_client in latencies for l in per_client]
+    return {
+        'throughput': len(flat) / elapsed,
+        'p50_ms': percentile(flat, 50) * 1000,
+        'p99_ms': percentile(flat, 99) * 1000
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help="requests per client")
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    n_features = len(serve_model.coefficients)
+    rows = [[random.random() for _ in range(n_features)] for _ in range(256)]
+
+    print "\n{:<22} {:>10} {:>10} {:>10} {:>10}".format(
+        'mode', 'req/s', 'p50 ms', 'p99 ms', 'avg batch')
+    result = run_clients(serve_model.predict_proba, rows, args.clients, args.requests)
+    print "{:<22} {:>10.0f} {:>10.3f} {:>10.3f} {:>10}".format(
+        'unbatched', result['throughput'], result['p50_ms'], result['p99_ms'], '1.0')
+
+    for window_us in [50, 200, 1000, 5000]:
+        coalescer = RequestCoalescer(serve_model.predict_proba_batch, args.max_batch, window_us)
+        result = run_clients(coalescer.submit, rows, args.clients, args.requests)
+        print "{:<22} {:>10.0f} {:>10.3f} {:>10.3f} {:>10.1f}".format(
+            'coalesce {}us'.format(window_us), result['throughput'], result['p50_ms'],
+            result['p99_ms'], coalescer.stats()['mean_batch_size'])
+    print "\npredict_proba_batch scores row by row, so batching saves no work here;"
+    print "--coalesce only adds its window until the scorer has a per-call cost to share."
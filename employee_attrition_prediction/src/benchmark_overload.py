@@ -0,0 +1,175 @@
+"""
+Overload test: latency of serve_model.py at a multiple of its capacity.
+
+Starts the server without and with admission control, measures capacity
+with one closed-loop client sending /predict/batch requests, then offers
+--load times that rate open-loop (requests start on schedule whether or
+not earlier ones finished) for --seconds. Reports completed and shed
+requests and latency percentiles; exits non-zero when the admission
+controlled p99 exceeds --max-p99-ms. Run from src/ after train_model.py:
+
+    python benchmark_overload.py --load 2 --seconds 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib2
+
+from generate_data import generate_dataset
+from train_model import load_model_artifacts, transform_row
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+def start_server(port, extra_args):
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen([sys.executable, 'serve_model.py', '--port', str(port)] +
+                                   extra_args, stdout=devnull, stderr=devnull)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib2.urlopen('http://localhost:{}/shadow'.format(port), timeout=1)
+        except urllib2.HTTPError:
+            return process  # Up: /shadow answers 404 when shadowing is off
+        except Exception:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("serve_model.py did not start on port {}".format(port))
+
+def stop_server(process):
+    process.send_signal(signal.SIGINT)
+    time.sleep(0.5)
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+def send(url, body, timeout):
+    """Returns (status, seconds); status 0 for timeouts and connection errors."""
+    start = time.time()
+    try:
+        urllib2.urlopen(urllib2.Request(url, body, {'Content-Type': 'application/json'}),
+                        timeout=timeout).read()
+        status = 200
+    except urllib2.HTTPError as e:
+        e.read()
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.time() - start
+
+def capacity(url, body, n_requests):
+    start = time.time()
+    for _ in range(n_requests):
+        send(url, body, 30)
+    return n_requests / (time.time() - start)
+
+def open_loop(url, body, rate, seconds, timeout, offset=0.0):
+    results = []
+    lock = threading.Lock()
+
+    def one():
+        result = send(url, body, timeout)
+        with lock:
+            results.append(result)
+
+    threads = []
+    start = time.time() + offset
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        t = threading.Thread(target=one)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join(timeout + 1)
+    return results
+
+def _open_loop(task):
+    return open_loop(*task)
+
+def offer_load(url, body, rate, seconds, timeout, processes):
+    # Several client processes, so the load generator itself is not
+    # limited by one interpreter lock; their schedules are interleaved
+    per_process = rate / processes
+    tasks = [(url, body, per_process, seconds, timeout, i / rate) for i in range(processes)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return [result for part in pool.map(_open_loop, tasks) for result in part]
+    finally:
+        pool.close()
+        pool.join()
+
+def summarize(name, results):
+    ok = [seconds for status, seconds in results if status == 200]
+    shed = [seconds for status, seconds in results if status in (429, 503, 504)]
+    failed = len(results) - len(ok) - len(shed)
+    row = {'offered': len(results), 'ok': len(ok), 'shed': len(shed), 'failed': failed,
+           'ok_p50_ms': percentile(ok, 50) * 1000 if ok else 0.0,
+           'ok_p99_ms': percentile(ok, 99) * 1000 if ok else 0.0,
+           'shed_p99_ms': percentile(shed, 99) * 1000 if shed else 0.0}
+    print "{:<20} {:>8} {:>6} {:>6} {:>7} {:>10.1f} {:>10.1f} {:>12.1f}".format(
+        name, row['offered'], row['ok'], row['shed'], row['failed'], row['ok_p50_ms'],
+        row['ok_p99_ms'], row['shed_p99_ms'])
+    return row
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows-per-request', type=int, default=200)
+    parser.add_argument('--load', type=float, default=2.0, help="offered load / capacity")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=10, help="client timeout in seconds")
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--max-concurrent', type=int, default=1)
+    parser.add_argument('--max-queue', type=int, default=4)
+    parser.add_argument('--deadline-ms', type=float, default=1000)
+    parser.add_argument('--max-p99-ms', type=float, default=1000,
+                        help="fail when the admission controlled p99 is above this")
+    args = parser.parse_args()
+
+    encoder = load_model_artifacts('model_artifacts.json').get('encoder')
+    if encoder is None:
+        raise SystemExit("model_artifacts.json has no encoder; retrain with train_model.py")
+    headers, raw = generate_dataset(args.rows_per_request)
+    positions = [headers.index(col['name']) for col in encoder['columns']]
+    rows = [transform_row(encoder, [row[p] for p in positions]) for row in raw]
+    body = json.dumps({'rows': rows})
+    url = 'http://localhost:{}/predict/batch'.format(args.port)
+
+    configs = [
+        ('no admission', []),
+        ('admission control', ['--max-concurrent', str(args.max_concurrent),
+                               '--max-queue', str(args.max_queue),
+                               '--default-deadline-ms', str(args.deadline_ms)]),
+    ]
+    results = {}
+    for name, extra_args in configs:
+        server = start_server(args.port, extra_args)
+        try:
+            rate = capacity(url, body, 20)
+            if name == configs[0][0]:
+                print "\nCapacity {:.1f} req/s ({} rows each); offering {:.1f} req/s".format(
+                    rate, args.rows_per_request, rate * args.load)
+                print "{:<20} {:>8} {:>6} {:>6} {:>7} {:>10} {:>10} {:>12}".format(
+                    'server', 'offered', 'ok', 'shed', 'failed', 'ok p50 ms', 'ok p99 ms',
+                    'shed p99 ms')
+                offered = rate * args.load
+            results[name] = summarize(name, offer_load(url, body, offered, args.seconds,
+                                                       args.timeout, args.client_processes))
+        finally:
+            stop_server(server)
+
+    p99 = results['admission control']['ok_p99_ms']
+    if p99 > args.max_p99_ms:
+        print "FAIL: p99 {:.1f} ms above {:.1f} ms".format(p99, args.max_p99_ms)
+        sys.exit(1)
+    print "p99 {:.1f} ms within {:.1f} ms".format(p99, args.max_p99_ms)
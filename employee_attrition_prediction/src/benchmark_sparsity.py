@@ -0,0 +1,67 @@
+"""
+Dense against L1-pruned models: size, serve latency and accuracy.
+
+Trains one dense model and one per --l1 strength on the same seeded split,
+then reports the non-zero coefficient count, artifact size in bytes, mean
+scoring latency through serve_model.score_active and test accuracy/AUC.
+Run from src/:
+
+    python benchmark_sparsity.py --rows 20000 --l1 0.01 0.1 1.0
+"""
+import argparse
+import json
+import random
+import time
+
+from generate_data import generate_dataset
+from serve_model import score_active
+from train_model import (one_hot_encode, split_indices, train_logistic_regression,
+                         prune_coefficients, evaluate, roc_auc)
+
+def artifact_bytes(coefficients, intercept, features, pruned):
+    artifacts = {'intercept': intercept, 'features': features}
+    if pruned:
+        artifacts['active'], artifacts['weights'] = prune_coefficients(coefficients)
+    else:
+        artifacts['coefficients'] = coefficients
+    return len(json.dumps(artifacts))
+
+def serve_latency_us(coefficients, intercept, rows, repeat=5):
+    index, weights = prune_coefficients(coefficients)
+    start = time.time()
+    for _ in range(repeat):
+        for row in rows:
+            score_active(row, index, weights, intercept)
+    return (time.time() - start) / (repeat * len(rows)) * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--l1', type=float, nargs='+', default=[0.01, 0.1, 1.0])
+    parser.add_argument('--learning-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    random.seed(42)
+    headers, raw = generate_dataset(args.rows)
+    y = [float(row[-1]) for row in raw]
+    features, data = one_hot_encode(headers[:-1], [row[:-1] for row in raw])
+    for i in range(len(data)):
+        data[i].append(y[i])
+    train_idx, test_idx = split_indices(y, seed=42)
+    # Serve requests carry only the features, as clients send them
+    requests = [data[i][:-1] for i in test_idx]
+
+    print "\n{:<10} {:>8} {:>9} {:>11} {:>9} {:>8}".format(
+        'model', 'non-zero', 'bytes', 'latency us', 'accuracy', 'AUC')
+    for l1 in [0.0] + args.l1:
+        model = train_logistic_regression(data, learning_rate=args.learning_rate,
+                                          epochs=args.epochs, indices=train_idx, l1=l1)
+        coefficients, intercept = model
+        metrics = evaluate(model, data, test_idx)
+        print "{:<10} {:>8} {:>9} {:>11.2f} {:>9.4f} {:>8.4f}".format(
+            'dense' if l1 == 0 else 'l1={:g}'.format(l1),
+            len(prune_coefficients(coefficients)[0]),
+            artifact_bytes(coefficients, intercept, features, l1 > 0),
+            serve_latency_us(coefficients, intercept, requests),
+            metrics['accuracy'], roc_auc(model, data, test_idx))
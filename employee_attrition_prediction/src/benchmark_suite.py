@@ -0,0 +1,230 @@
+"""
+End-to-end performance benchmarks for the attrition pipeline.
+
+Times generate_dataset, load_csv, one_hot_encode, train_logistic_regression
+(one epoch), evaluate and the serve_model /predict handler at several
+dataset sizes. Each stage runs in a fresh worker process; once its inputs
+are built the peak RSS is reset (Linux /proc/self/clear_refs), so peak MB is
+what the stage itself allocates above its inputs. Where the reset is not
+available it is the worker's absolute peak.
+
+    python benchmark_suite.py --sizes 10000 100000 1000000 --output results.json
+    python benchmark_suite.py --sizes 10000 --baseline benchmark_baseline.json
+
+With --baseline the run fails (exit code 1) when the baseline is missing, or
+when a stage's rows/sec drops, or its peak memory grows, by more than
+--threshold compared to the stored results. Speed is compared relative to
+a pure-Python calibration loop timed in the same worker right before the
+stage, so a baseline from a faster or slower machine still applies and
+drift in machine load mostly cancels out. --update-baseline writes this
+run's results as the new baseline. Each stage reports the median of
+--repeat runs, interleaved with the other stages' runs.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from StringIO import StringIO
+
+from generate_data import generate_dataset
+from train_model import load_csv, one_hot_encode, train_logistic_regression, evaluate
+
+STAGES = ['generate', 'load_csv', 'encode', 'train', 'evaluate', 'serve']
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def reset_peak_rss():
+    """Sets the peak RSS to the current RSS (Linux 4.0+); False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+def calibrate(n=200000, repeat=3):
+    """Loop iterations per second of plain Python, the yardstick for rows/sec."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        total = 0.0
+        for i in xrange(n):
+            total += i * 0.5
+        seconds = time.time() - start
+        best = seconds if best is None else min(best, seconds)
+    return n / best
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+def encoded_rows(csv_path):
+    headers, raw = load_csv(csv_path)
+    y = [float(row[-1]) for row in raw]
+    encoded_headers, data = one_hot_encode(headers[:-1], [row[:-1] for row in raw])
+    for i in range(len(data)):
+        data[i].append(y[i])
+    return data
+
+class _FakeSocket(object):
+    """Feeds one raw HTTP request to a handler without a real connection."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def makefile(self, mode, bufsize=-1):
+        return StringIO(self.request) if 'r' in mode else StringIO()
+
+def prepare(stage, n_rows, csv_path):
+    """Builds the stage's inputs (untimed) and returns a zero-argument callable."""
+    if stage == 'generate':
+        return lambda: generate_dataset(n_rows)
+    if stage == 'load_csv':
+        return lambda: load_csv(csv_path)
+    if stage == 'encode':
+        headers, raw = load_csv(csv_path)
+        X_raw = [row[:-1] for row in raw]
+        return lambda: one_hot_encode(headers[:-1], X_raw)
+    if stage == 'train':
+        data = encoded_rows(csv_path)
+        return lambda: train_logistic_regression(data, epochs=1)
+    if stage == 'evaluate':
+        data = encoded_rows(csv_path)
+        model = ([0.01] * (len(data[0]) - 1), 0.0)
+        return lambda: evaluate(model, data)
+
+    import serve_model
+
+    class QuietHandler(serve_model.RequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    n_features = len(serve_model.coefficients)
+    requests = []
+    for _ in range(256):
+        body = json.dumps({'features': [random.random() for _ in range(n_features)]})
+        requests.append("POST /predict HTTP/1.0\r\nContent-Type: application/json\r\n"
+                        "Content-Length: {}\r\n\r\n{}".format(len(body), body))
+
+    def serve():
+        for i in xrange(n_rows):
+            QuietHandler(_FakeSocket(requests[i % len(requests)]), ('127.0.0.1', 0), None)
+    return serve
+
+def run_stage(job):
+    stage, n_rows, csv_path = job
+    random.seed(0)
+    func = prepare(stage, n_rows, csv_path)
+    calibration = calibrate()
+    # Building the inputs may have peaked above what they hold; without a
+    # reset that headroom would hide the stage's own allocations
+    rss_before = peak_rss_mb() if reset_peak_rss() else 0.0
+    start = time.time()
+    func()
+    seconds = time.time() - start
+    return {
+        'stage': stage,
+        'rows': n_rows,
+        'seconds': seconds,
+        'rows_per_sec': n_rows / seconds if seconds > 0 else 0.0,
+        # Rows per million calibration loop iterations: comparable across machines
+        'relative_speed': n_rows / seconds / calibration * 1e6 if seconds > 0 else 0.0,
+        'peak_mb': max(peak_rss_mb() - rss_before, 0.0)
+    }
+
+def write_csv(n_rows, path):
+    random.seed(0)
+    headers, data = generate_dataset(n_rows)
+    with open(path, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(data)
+
+def compare(report, baseline, threshold):
+    failures = []
+    for key, result in sorted(report['results'].items()):
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        if result['relative_speed'] < base['relative_speed'] * (1 - threshold):
+            failures.append("{}: {:.0f} vs baseline {:.0f} rows per 1M calibration loops".format(
+                key, result['relative_speed'], base['relative_speed']))
+        # Small allocations are dominated by allocator noise, so allow 1MB slack
+        if result['peak_mb'] > base['peak_mb'] * (1 + threshold) + 1.0:
+            failures.append("{}: {:.1f} MB peak vs baseline {:.1f}".format(
+                key, result['peak_mb'], base['peak_mb']))
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--output', help="write this run's results to a JSON file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed fractional regression before failing")
+    parser.add_argument('--repeat', type=int, default=5, help="report the median of N runs")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='attrition_bench_')
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    results = {}
+    try:
+        print "{:<10} {:>9} {:>10} {:>12} {:>10}".format('stage', 'rows', 'seconds', 'rows/s',
+                                                          'peak MB')
+        for n_rows in args.sizes:
+            csv_path = os.path.join(workdir, 'data_{}.csv'.format(n_rows))
+            write_csv(n_rows, csv_path)
+            runs = dict((stage, []) for stage in args.stages)
+            # Interleaved, so a slow spell on the machine hits every stage a little
+            # rather than all runs of one stage
+            for _ in range(args.repeat):
+                for stage in args.stages:
+                    runs[stage].append(pool.apply(run_stage, ((stage, n_rows, csv_path),)))
+            for stage in args.stages:
+                result = sorted(runs[stage], key=lambda r: r['relative_speed'])[args.repeat // 2]
+                result['peak_mb'] = median([r['peak_mb'] for r in runs[stage]])
+                results['{}@{}'.format(stage, n_rows)] = result
+                print "{:<10} {:>9} {:>10.2f} {:>12.0f} {:>10.1f}".format(
+                    stage, n_rows, result['seconds'], result['rows_per_sec'], result['peak_mb'])
+            os.remove(csv_path)
+    finally:
+        pool.terminate()
+        shutil.rmtree(workdir)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print "Saved baseline {}".format(args.baseline)
+    elif args.baseline:
+        if not os.path.exists(args.baseline):
+            print "No baseline at {}; create one with --update-baseline".format(args.baseline)
+            sys.exit(1)
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.threshold)
+        if failures:
+            print "\nPerformance regressions (threshold {:.0%}):".format(args.threshold)
+            for failure in failures:
+                print "  " + failure
+            sys.exit(1)
+        print "\nNo regressions against {}".format(args.baseline)
@@ -0,0 +1,64 @@
+"""
+Payload size and server CPU of the /predict/batch wire formats.
+
+Encodes --records synthetic rows with the training encoder, then measures,
+for JSON and the binary vector format (float64 and float32), with and
+without gzip, the request/response bytes and the server-side CPU time to
+decode the request and encode the response. Scoring is the same for every
+format and is left out. Run from src/:
+
+    python benchmark_wire_format.py --records 10000
+"""
+import argparse
+import json
+import random
+import time
+
+import wire_format
+from generate_data import generate_dataset
+from train_model import one_hot_encode
+
+def server_cpu_seconds(request, content_type, encoding, probs, binary, typecode, gzip_response,
+                       repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        wire_format.decode_rows(request, content_type, encoding)
+        _, body = wire_format.encode_probabilities(probs, binary, typecode)
+        if gzip_response:
+            body = wire_format.gzip_bytes(body)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3, help="best of N timings")
+    args = parser.parse_args()
+
+    random.seed(42)
+    headers, raw = generate_dataset(args.records)
+    _, rows = one_hot_encode(headers[:-1], [row[:-1] for row in raw])
+    probs = [random.random() for _ in rows]
+
+    formats = [
+        ('json', wire_format.JSON_TYPE, False, 'd'),
+        ('binary float64', wire_format.BINARY_TYPE, True, 'd'),
+        ('binary float32', wire_format.BINARY_TYPE, True, 'f'),
+    ]
+    print "\n{} records x {} features".format(len(rows), len(rows[0]))
+    print "{:<22} {:>13} {:>14} {:>15}".format(
+        'format', 'request bytes', 'response bytes', 'server CPU ms')
+    for name, content_type, binary, typecode in formats:
+        if binary:
+            request = wire_format.pack_vectors(rows, typecode)
+        else:
+            request = json.dumps({'rows': rows})
+        for gzipped in (False, True):
+            body = wire_format.gzip_bytes(request) if gzipped else request
+            cpu, response_bytes = server_cpu_seconds(
+                body, content_type, 'gzip' if gzipped else None, probs, binary, typecode,
+                gzipped, args.repeat)
+            print "{:<22} {:>13} {:>14} {:>15.1f}".format(
+                name + (' + gzip' if gzipped else ''), len(body), response_bytes, cpu * 1000)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+class _Slot(object):
+    """Holds one caller's result until its batch has been scored."""
+
+    def __init__(self, features):
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class RequestCoalescer(object):
+    """
+    Collects concurrent single-record requests into micro-batches.
+
+    The first request to arrive opens a window of `max_wait_us` microseconds.
+    The batch is scored as soon as the window closes or `max_batch` records
+    are waiting, whichever comes first, and every caller blocked in submit()
+    receives its own probability. `score_batch` takes a list of feature
+    vectors and returns a list of probabilities in the same order.
+
+    Coalescing only pays off when one call to `score_batch` is cheaper than
+    scoring its rows one by one. serve_model.predict_proba_batch is the same
+    per-row Python loop as predict_proba, so with it the window is pure
+    added latency (see benchmark_coalescer.py).
+    """
+
+    def __init__(self, score_batch, max_batch=32, max_wait_us=500):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_us / 1e6
+        self.pending = []
+        self.cond = threading.Condition()
+
+        # Counters for sizing the window, see stats()
+        self.batches = 0
+        self.records = 0
+
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        worker.start()
+
+    def submit(self, features):
+        slot = _Slot(features)
+        with self.cond:
+            self.pending.append(slot)
+            if len(self.pending) == 1 or len(self.pending) >= self.max_batch:
+                self.cond.notify()
+        slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    def _next_batch(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            deadline = time.time() + self.max_wait
+            while len(self.pending) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = self.pending[:self.max_batch]
+            del self.pending[:self.max_batch]
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                probs = self.score_batch([slot.features for slot in batch])
+                for slot, prob in zip(batch, probs):
+                    slot.result = prob
+            except Exception as e:
+                for slot in batch:
+                    slot.error = e
+            with self.cond:
+                self.batches += 1
+                self.records += len(batch)
+            for slot in batch:
+                slot.done.set()
+
+    def stats(self):
+        with self.cond:
+            batches, records = self.batches, self.records
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_us': int(self.max_wait * 1e6),
+            'batches': batches,
+            'records': records,
+            'mean_batch_size': float(records) / batches if batches else 0.0
+        }
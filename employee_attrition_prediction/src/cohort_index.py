@@ -0,0 +1,88 @@
+"""
+Column code indexes for fast cohort drill-down in the Streamlit dashboard.
+
+Every categorical column is factorized once into a compact array of value
+codes (one byte per row for up to 254 distinct values), so memory grows with
+rows times columns, not with the number of distinct values. A cohort is a
+boolean row mask: each filtered column contributes one table lookup over
+its codes, and counts, attrition rates and per-value breakdowns come from
+vectorized sums and bincounts, so a filter change never rescans the
+DataFrame.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _code_dtype(n_codes):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_codes <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class CohortIndex:
+    """Per-row value codes for the categorical columns of a DataFrame."""
+
+    def __init__(self, df, columns=None, target='Attrition'):
+        if columns is None:
+            columns = [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])]
+        self.n_rows = len(df)
+        self.target = df[target].to_numpy() == 1
+        self.codes = {}
+        self.uniques = {}
+
+        for col in columns:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            # Shift by one so code 0 is a missing value, which matches no filter
+            self.codes[col] = (codes + 1).astype(_code_dtype(len(uniques) + 1))
+            self.uniques[col] = list(uniques)
+
+    @property
+    def columns(self):
+        return list(self.codes)
+
+    def values(self, column):
+        return list(self.uniques[column])
+
+    def select(self, filters):
+        """
+        Boolean row mask of the rows matching `filters` ({column: [values]}):
+        values of one column are ORed, columns are ANDed. No filters selects all.
+        """
+        cohort = np.ones(self.n_rows, dtype=bool)
+        for column, values in filters.items():
+            if not values:
+                continue
+            uniques = self.uniques[column]
+            allowed = np.zeros(len(uniques) + 1, dtype=bool)
+            positions = {value: k + 1 for k, value in enumerate(uniques)}
+            for value in values:
+                if value in positions:
+                    allowed[positions[value]] = True
+            cohort &= allowed[self.codes[column]]
+        return cohort
+
+    def stats(self, cohort):
+        """Returns (employees, attrition count, attrition rate) for a cohort."""
+        count = int(np.count_nonzero(cohort))
+        left = int(np.count_nonzero(cohort & self.target))
+        return count, left, (left / count if count else 0.0)
+
+    def breakdown(self, column, cohort=None):
+        """Employees, attrition count and rate per value of `column` in a cohort."""
+        codes = self.codes[column]
+        target = self.target
+        if cohort is not None:
+            codes, target = codes[cohort], target[cohort]
+        n_codes = len(self.uniques[column]) + 1
+        employees = np.bincount(codes, minlength=n_codes)[1:]
+        attrition = np.bincount(codes[target], minlength=n_codes)[1:]
+        present = employees > 0
+        employees, attrition = employees[present], attrition[present]
+        return pd.DataFrame({
+            'value': np.asarray(self.uniques[column], dtype=object)[present],
+            'employees': employees,
+            'attrition': attrition,
+            'attrition_rate': attrition / employees
+        }, columns=['value', 'employees', 'attrition', 'attrition_rate'])
@@ -0,0 +1,186 @@
+"""
+Per-cohort confusion matrix and feature contribution reports.
+
+Scores the data once with the saved model and, in the same pass,
+accumulates a confusion matrix and per-feature sums for every value of each
+--by column. A cohort's mean contribution of feature i is then
+coefficient[i] * mean(x_i), so no per-row contribution vectors are kept.
+The confusion matrices count only the rows train_model.py held out (the
+split is rebuilt from the seed saved in the artifacts); when that is not
+possible, e.g. for a different extract, they cover all rows and are
+labelled in-sample. The SVGs are rendered across a process pool. Run from
+src/:
+
+    python cohort_reports.py --by EMPLOYEE_HIRE_COST_CENTER_NAME_CATEGORY EMPLOYEE_HIRE_MANAGER_6_NAME
+
+Writes reports/<column>/<value>/{confusion_matrix,feature_contributions}.svg
+and reports/index.json with the metrics of every cohort. Reports listed in
+the previous index.json for cohorts that no longer exist are removed.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import time
+
+from train_model import (load_model_artifacts, transform_row, predict_proba, safe_name,
+                         split_indices, svg_bar_chart, svg_confusion_matrix)
+
+def held_out_rows(data_path, split, target_column='Attrition'):
+    """
+    Row mask (bytearray) of the test rows of the training run described by
+    the artifacts' `split`, or None if this data is not what it was run on.
+    """
+    if not split:
+        return None
+    with open(data_path, 'rb') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        target_pos = headers.index(target_column)
+        group_pos = headers.index(split['group_by']) if split['group_by'] else None
+        labels = []
+        groups = [] if group_pos is not None else None
+        for row in reader:
+            labels.append(float(row[target_pos]))
+            if groups is not None:
+                groups.append(row[group_pos])
+    if len(labels) != split['rows']:
+        return None
+    mask = bytearray(len(labels))
+    for i in split_indices(labels, split['test_size'], split['seed'], groups)[1]:
+        mask[i] = 1
+    return mask
+
+def accumulate(data_path, artifacts, by_columns, target_column='Attrition', eval_rows=None):
+    """
+    Single pass: {(column, value): [tn, fp, fn, tp, n, feature_sums]}. Only
+    rows set in `eval_rows` (all when None) count in the confusion matrix;
+    n and the feature sums cover every row.
+    """
+    encoder = artifacts['encoder']
+    coefficients = artifacts['coefficients']
+    intercept = artifacts['intercept']
+    active = [i for i, c in enumerate(coefficients) if c != 0.0]
+
+    cohorts = {}
+    with open(data_path, 'rb') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        positions = [headers.index(col['name']) for col in encoder['columns']]
+        by_positions = [(col, headers.index(col)) for col in by_columns]
+        target_pos = headers.index(target_column)
+
+        for row_number, row in enumerate(reader):
+            x = transform_row(encoder, [row[p] for p in positions])
+            cell = None
+            if eval_rows is None or eval_rows[row_number]:
+                prediction = 1 if predict_proba(x, coefficients, intercept) >= 0.5 else 0
+                cell = 2 * int(float(row[target_pos])) + prediction  # tn, fp, fn, tp
+            for col, pos in by_positions:
+                key = (col, row[pos])
+                stats = cohorts.get(key)
+                if stats is None:
+                    stats = cohorts[key] = [0, 0, 0, 0, 0, [0.0] * len(active)]
+                if cell is not None:
+                    stats[cell] += 1
+                stats[4] += 1
+                sums = stats[5]
+                for j, i in enumerate(active):
+                    sums[j] += x[i]
+    return cohorts, active
+
+def prune_reports(out_dir, keep):
+    """Removes report directories from the last index.json that are not in `keep`."""
+    index_path = os.path.join(out_dir, 'index.json')
+    if not os.path.exists(index_path):
+        return 0
+    with open(index_path, 'r') as f:
+        previous = json.load(f)
+    removed = 0
+    for entry in previous:
+        path = entry.get('report')
+        # Only directories this script wrote under out_dir are touched
+        if (path and path not in keep and os.path.isdir(path) and
+                os.path.normpath(os.path.dirname(os.path.dirname(path))) ==
+                os.path.normpath(out_dir)):
+            shutil.rmtree(path)
+            removed += 1
+            column_dir = os.path.dirname(path)
+            if not os.listdir(column_dir):
+                os.rmdir(column_dir)
+    return removed
+
+def render_cohort(task):
+    column, value, cm, scope, features, contributions, out_dir = task
+    cohort_dir = os.path.join(out_dir, safe_name(column), safe_name(value))
+    if not os.path.isdir(cohort_dir):
+        os.makedirs(cohort_dir)
+    with open(os.path.join(cohort_dir, 'confusion_matrix.svg'), 'w') as f:
+        f.write(svg_confusion_matrix(cm, "Confusion Matrix ({}): {}".format(scope, value)))
+    with open(os.path.join(cohort_dir, 'feature_contributions.svg'), 'w') as f:
+        f.write(svg_bar_chart(features, contributions, "Top Contributions: {}".format(value)))
+    return cohort_dir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--data', default='synthetic_attrition_data.csv')
+    parser.add_argument('--artifacts', default='model_artifacts.json')
+    parser.add_argument('--by', nargs='+', default=['EMPLOYEE_HIRE_COST_CENTER_NAME_CATEGORY',
+                                                   'EMPLOYEE_HIRE_MANAGER_6_NAME'])
+    parser.add_argument('--output', default='reports')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    artifacts = load_model_artifacts(args.artifacts)
+    if artifacts.get('encoder') is None:
+        raise SystemExit("{} has no encoder; retrain with train_model.py".format(args.artifacts))
+
+    start = time.time()
+    eval_rows = held_out_rows(args.data, artifacts.get('split'))
+    scope = 'held-out' if eval_rows is not None else 'in-sample'
+    if eval_rows is None:
+        print "Cannot rebuild the training split for {}; confusion matrices are in-sample".format(
+            args.data)
+    cohorts, active = accumulate(args.data, artifacts, args.by, eval_rows=eval_rows)
+    print "Scored and accumulated {} cohorts in {:.2f}s".format(len(cohorts), time.time() - start)
+
+    features = [artifacts['features'][i] for i in active]
+    coefs = [artifacts['coefficients'][i] for i in active]
+    tasks = []
+    index = []
+    seen = {}
+    for (column, value), (tn, fp, fn, tp, n, sums) in sorted(cohorts.items()):
+        # safe_name() keeps distinct values apart; this guards the hash suffix too
+        path = (safe_name(column), safe_name(value))
+        if path in seen:
+            raise ValueError("cohorts {!r} and {!r} map to the same report directory".format(
+                seen[path], value))
+        seen[path] = value
+        contributions = [c * s / n for c, s in zip(coefs, sums)]
+        tasks.append((column, value, [[tn, fp], [fn, tp]], scope, features, contributions,
+                      args.output))
+        evaluated = tn + fp + fn + tp
+        index.append({'column': column, 'value': value, 'employees': n,
+                      'evaluated': evaluated, 'scope': scope,
+                      'accuracy': float(tn + tp) / evaluated if evaluated else None,
+                      'attrition': fn + tp, 'predicted_attrition': fp + tp})
+
+    start = time.time()
+    pool = multiprocessing.Pool(args.workers)
+    try:
+        paths = pool.map(render_cohort, tasks, chunksize=max(1, len(tasks) // (args.workers * 4)))
+    finally:
+        pool.close()
+        pool.join()
+    for entry, path in zip(index, paths):
+        entry['report'] = path
+    removed = prune_reports(args.output, set(paths))
+    if removed:
+        print "Removed {} reports of cohorts no longer in the data".format(removed)
+
+    with open(os.path.join(args.output, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    print "Rendered {} cohort reports to {}/ in {:.2f}s ({} workers)".format(
+        len(tasks), args.output, time.time() - start, args.workers)
@@ -0,0 +1,225 @@
+"""
+Streaming EDA aggregates for the Streamlit dashboard.
+
+StreamingEDA reads the data in chunks and keeps only what the EDA page
+draws: row and attrition counts, per-column means and variances, a
+co-moment matrix of the numeric columns and the target for the correlation
+heatmap (merged per chunk with Chan's parallel update), pre-binned
+histograms split by attrition, and a uniform reservoir sample of rows for
+the preview table. Memory and render time depend on the number of columns
+and bins, not on the number of rows, and refresh() folds in rows appended
+to the CSV since the last call. A file that was replaced, truncated or
+rewritten in place is read again from the start.
+"""
+
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class StreamingHistogram:
+    """
+    Fixed number of equal-width bins whose range doubles (merging pairs of
+    bins) whenever a value falls outside it, so counts stay exact.
+    """
+
+    def __init__(self, bins=30, n_classes=2):
+        self.bins = bins
+        self.lo = None
+        self.width = None
+        self.counts = np.zeros((n_classes, bins), dtype=np.int64)
+
+    def _grow(self, left):
+        # Pad with a bin range of the current size, then merge pairs
+        pad = np.zeros_like(self.counts)
+        merged = np.concatenate([pad, self.counts] if left else [self.counts, pad], axis=1)
+        if left:
+            self.lo -= self.bins * self.width
+        self.width *= 2
+        self.counts = merged.reshape(merged.shape[0], self.bins, 2).sum(axis=2)
+
+    def update(self, values, classes):
+        if len(values) == 0:
+            return
+        vmin, vmax = values.min(), values.max()
+        if self.lo is None:
+            self.lo = float(vmin)
+            self.width = max(float(vmax - vmin), 1e-9) / self.bins * (1 + 1e-9)
+        while vmin < self.lo:
+            self._grow(left=True)
+        while vmax >= self.lo + self.bins * self.width:
+            self._grow(left=False)
+        idx = np.minimum(((values - self.lo) / self.width).astype(np.int64), self.bins - 1)
+        flat = np.bincount(classes * self.bins + idx, minlength=self.counts.size)
+        self.counts += flat.reshape(self.counts.shape)
+
+    def edges(self):
+        return self.lo + self.width * np.arange(self.bins + 1)
+
+
+class StreamingEDA:
+    # Bytes before the read offset compared on refresh to spot in-place rewrites
+    TAIL_BYTES = 4096
+
+    def __init__(self, target='Attrition', bins=30, reservoir_size=1000, seed=0):
+        self.target = target
+        self.bins = bins
+        self.reservoir_size = reservoir_size
+        self.seed = seed
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.rng = np.random.default_rng(self.seed)
+        self.columns = None
+        self.numeric_columns = None
+        self.moment_columns = None
+        self.n_rows = 0
+        self.positives = 0
+        self.n_complete = 0
+        self.mean = None
+        self.comoment = None
+        self.histograms = {}
+        self.sample = None
+        # Where the last refresh stopped and what the file looked like then
+        self.offset = 0
+        self.header = None
+        self.tail = b''
+        self.file_state = None
+
+    def _init_columns(self, chunk):
+        self.columns = list(chunk.columns)
+        self.numeric_columns = [c for c in chunk.columns
+                                if pd.api.types.is_numeric_dtype(chunk[c]) and c != self.target]
+        # The target joins the co-moments so the heatmap shows what correlates with it
+        self.moment_columns = self.numeric_columns + [self.target]
+        k = len(self.moment_columns)
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+        self.histograms = {c: StreamingHistogram(self.bins) for c in self.numeric_columns}
+        self.sample = chunk.iloc[:0].copy()
+
+    def update(self, chunk):
+        """Folds one DataFrame chunk into the aggregates."""
+        if self.columns is None:
+            self._init_columns(chunk)
+        target = chunk[self.target].to_numpy().astype(np.int64)
+        self.positives += int(target.sum())
+
+        values = chunk[self.moment_columns].to_numpy(dtype=float)
+        complete = values[~np.isnan(values).any(axis=1)]
+        n_b = len(complete)
+        if n_b:
+            mean_b = complete.mean(axis=0)
+            centered = complete - mean_b
+            comoment_b = centered.T @ centered
+            n_a = self.n_complete
+            delta = mean_b - self.mean
+            n = n_a + n_b
+            self.comoment += comoment_b + np.outer(delta, delta) * (n_a * n_b / n)
+            self.mean += delta * (n_b / n)
+            self.n_complete = n
+
+        for j, column in enumerate(self.numeric_columns):
+            present = ~np.isnan(values[:, j])
+            self.histograms[column].update(values[present, j], target[present])
+
+        self._sample(chunk)
+        self.n_rows += len(chunk)
+
+    def _sample(self, chunk):
+        # Algorithm R: row t (0-based, over all rows seen) replaces a random
+        # reservoir slot with probability k / (t + 1)
+        k = self.reservoir_size
+        fill = max(0, min(k - len(self.sample), len(chunk)))
+        if fill:
+            self.sample = pd.concat([self.sample, chunk.iloc[:fill]], ignore_index=True)
+        t = self.n_rows + fill + np.arange(len(chunk) - fill)
+        slots = (self.rng.random(len(t)) * (t + 1)).astype(np.int64)
+        # Only the last row to land in a slot survives the chunk
+        final = {}
+        for i in np.nonzero(slots < k)[0]:
+            final[slots[i]] = fill + i
+        if final:
+            # Sample order carries no meaning, so replace by drop + append
+            self.sample = pd.concat([self.sample.drop(index=list(final)),
+                                     chunk.iloc[list(final.values())]], ignore_index=True)
+
+    def refresh(self, path, chunksize=100_000):
+        """
+        Reads rows appended to `path` since the last call; returns how many.
+        If the file was replaced, shrank or was rewritten, the aggregates are
+        rebuilt from the whole file.
+        """
+        # Dashboard sessions share one instance, so refreshes must not overlap
+        with self.lock:
+            return self._refresh(path, chunksize)
+
+    def _unchanged_before_offset(self, f, stat, header):
+        # Same file, not shorter, same header and the same bytes up to the
+        # offset: anything past it was appended
+        if (stat.st_ino, stat.st_dev) != self.file_state[:2] or stat.st_size < self.offset:
+            return False
+        if header != self.header:
+            return False
+        f.seek(self.offset - len(self.tail))
+        return f.read(len(self.tail)) == self.tail
+
+    def _refresh(self, path, chunksize):
+        stat = os.stat(path)
+        file_state = (stat.st_ino, stat.st_dev, stat.st_size, stat.st_mtime_ns)
+        if file_state == self.file_state:
+            return 0
+        rebuilt = False
+        with open(path, 'rb') as f:
+            header = f.readline()
+            if self.file_state is not None and not self._unchanged_before_offset(f, stat, header):
+                self._reset()
+                rebuilt = True
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        # A writer may be mid-line; leave the partial row for next time
+        data = data[:data.rfind(b'\n') + 1]
+        before = 0 if rebuilt else self.n_rows
+        if data:
+            options = {'chunksize': chunksize}
+            if self.columns is not None:
+                options.update(header=None, names=self.columns)
+            try:
+                for chunk in pd.read_csv(io.BytesIO(data), **options):
+                    # A header without rows has no dtypes to go by yet
+                    if len(chunk):
+                        self.update(chunk)
+            except Exception:
+                # Some chunks may already be folded in; start over next time
+                self._reset()
+                raise
+            if self.columns is None:
+                # Only a header so far; read it again together with the first rows
+                return 0
+            self.header = header
+            self.tail = (self.tail + data)[-self.TAIL_BYTES:]
+            self.offset += len(data)
+        self.file_state = file_state
+        return self.n_rows - before
+
+    def summary(self):
+        """Mean and standard deviation per numeric column and the target."""
+        n = self.n_complete
+        std = np.sqrt(np.diag(self.comoment) / (n - 1)) if n > 1 else np.zeros(len(self.mean))
+        return pd.DataFrame({'mean': self.mean, 'std': std}, index=self.moment_columns)
+
+    def corr(self):
+        """Correlation matrix of the numeric columns and the target."""
+        d = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(d, d)
+        return pd.DataFrame(corr, index=self.moment_columns, columns=self.moment_columns)
+
+    def histogram(self, column):
+        """Bin edges and per-class counts (rows: target 0, target 1)."""
+        hist = self.histograms[column]
+        return hist.edges(), hist.counts
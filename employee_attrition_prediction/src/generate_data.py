@@ -2,10 +2,11 @@ import random
 import csv
 import math
 
-def generate_dataset(n_samples=1000):
+def generate_dataset(n_samples=1000, n_managers=50, n_recruiters=20):
     """
     Generates a synthetic employee attrition dataset using pure Python 2.7.
     Matches the 'Total Variables Considered' list from user images (41 variables).
+    n_managers / n_recruiters set the cardinality of the name columns.
     """
     # List of 41 variables from the user's image "Total Variables Considered"
     feature_names = [
@@ -104,7 +105,7 @@ def generate_dataset(n_samples=1000):
         row.append("Family_" + str(random.randint(1, 8)))
         
         # MANAGER NAME
-        row.append("Manager_" + str(random.randint(1, 50)))
+        row.append("Manager_" + str(random.randint(1, n_managers)))
         
         # WORK CITY
         row.append("City_" + str(random.randint(1, 10)))
@@ -127,7 +128,7 @@ def generate_dataset(n_samples=1000):
         
         # TA STUFF
         row.append("Justification_" + str(random.randint(1, 5)))
-        row.append("Recruiter_" + str(random.randint(1, 20)))
+        row.append("Recruiter_" + str(random.randint(1, n_recruiters)))
         row.append("Source_" + str(random.randint(1, 5)))
         
         # TIME TO... (Numeric days)
@@ -0,0 +1,172 @@
+"""
+Content-addressed model registry and an LRU in-memory model store.
+
+The registry is a directory:
+
+    <root>/objects/<sha256>.json   model_artifacts.json files, named by content hash
+    <root>/segments.json           {segment key: sha256}
+
+so a retrained model is a new object and re-pointing a segment is one
+small index write; identical artifacts registered for several segments
+are stored (and loaded) once. ModelStore loads objects lazily on first use
+and keeps only the scoring state (active feature positions and weights)
+of recently used models under a byte budget, evicting the least recently
+used. Register models from src/:
+
+    python model_registry.py register model_artifacts.json --segment Sales --segment Marketing
+    python model_registry.py list
+"""
+import argparse
+import array
+import collections
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from train_model import load_model_artifacts
+
+class ModelRegistry(object):
+    def __init__(self, root='registry'):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'segments.json')
+        if not os.path.isdir(self.objects_dir):
+            os.makedirs(self.objects_dir)
+        self.lock = threading.Lock()
+        self.segments = self._read_index()
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def _write_index(self):
+        # Write-then-rename so a running server never reads a partial index
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.segments, f, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.index_path)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest + '.json')
+
+    def register(self, artifact_path, segments=()):
+        """Stores an artifact file under its content hash and points `segments` at it."""
+        sha = hashlib.sha256()
+        with open(artifact_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), ''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            shutil.copyfile(artifact_path, path + '.tmp')
+            os.rename(path + '.tmp', path)
+        with self.lock:
+            for segment in segments:
+                self.segments[segment] = digest
+            self._write_index()
+        return digest
+
+    def resolve(self, segment):
+        """Content hash of the model serving `segment`, or None."""
+        with self.lock:
+            return self.segments.get(segment)
+
+    def reload(self):
+        # Picks up segments registered by another process
+        with self.lock:
+            self.segments = self._read_index()
+
+class Model(object):
+    """Scoring state of one registered model."""
+
+    def __init__(self, digest, artifacts):
+        coefficients = artifacts['coefficients']
+        self.digest = digest
+        self.n_features = len(coefficients)
+        self.intercept = artifacts['intercept']
+        self.active_index = array.array('l', [i for i, c in enumerate(coefficients) if c != 0.0])
+        self.active_weights = array.array('d', [coefficients[i] for i in self.active_index])
+
+    def nbytes(self):
+        return (self.active_index.itemsize * len(self.active_index) +
+                self.active_weights.itemsize * len(self.active_weights))
+
+class ModelStore(object):
+    """
+    Lazily loaded, LRU-evicted models under `memory_budget` bytes of
+    scoring state. The most recently used model is always kept, even if
+    it alone exceeds the budget.
+    """
+
+    def __init__(self, registry, memory_budget=64 * 1024 * 1024):
+        self.registry = registry
+        self.memory_budget = memory_budget
+        self.models = collections.OrderedDict()
+        self.resident_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, segment):
+        """Model for `segment`, loading it if needed; None for unknown segments."""
+        digest = self.registry.resolve(segment)
+        if digest is None:
+            return None
+        with self.lock:
+            model = self.models.pop(digest, None)
+            if model is not None:
+                self.hits += 1
+                self.models[digest] = model
+                return model
+            self.misses += 1
+
+        # Parse outside the lock so other segments keep scoring meanwhile
+        model = Model(digest, load_model_artifacts(self.registry.object_path(digest)))
+        with self.lock:
+            if digest not in self.models:
+                self.models[digest] = model
+                self.resident_bytes += model.nbytes()
+                self._evict()
+            return self.models[digest]
+
+    def _evict(self):
+        while self.resident_bytes > self.memory_budget and len(self.models) > 1:
+            _, model = self.models.popitem(last=False)
+            self.resident_bytes -= model.nbytes()
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'segments': len(self.registry.segments),
+                'resident_models': len(self.models),
+                'resident_bytes': self.resident_bytes,
+                'memory_budget': self.memory_budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': float(self.hits) / requests if requests else 0.0
+            }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attrition model registry")
+    parser.add_argument('--root', default='registry')
+    commands = parser.add_subparsers(dest='command')
+    register = commands.add_parser('register', help="add an artifact and route segments to it")
+    register.add_argument('artifacts')
+    register.add_argument('--segment', action='append', default=[])
+    commands.add_parser('list', help="show segment routing")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'register':
+        digest = registry.register(args.artifacts, args.segment)
+        print "Registered {} as {}".format(args.artifacts, digest[:12])
+    for segment, digest in sorted(registry.segments.items()):
+        print "{:<40} {}".format(segment, digest[:12])
@@ -0,0 +1,141 @@
+"""
+Online learning from /feedback labels for serve_model.py.
+
+Labeled records are queued and applied by one background thread to a
+shadow copy of the coefficients with train_model.sgd_update, the same
+logistic step used in training, with the intercept step and each
+coefficient's change in one update bounded by `max_step`.
+Scoring never sees the shadow copy: every `swap_seconds` it is published
+to the live model through the `publish` callback.
+
+Before each update the record is also scored by the startup (baseline)
+model and by the shadow copy, so both have a prequential log-loss over the
+last `window` records. If at swap time the shadow's loss is more than
+`rollback_threshold` (relative) above the baseline's, the shadow is reset
+to the baseline and the baseline is published instead.
+"""
+import Queue
+import collections
+import math
+import threading
+import time
+
+from train_model import predict_proba, sgd_update
+
+def _log_loss(prob, label, eps=1e-15):
+    prob = min(max(prob, eps), 1.0 - eps)
+    return -math.log(prob) if label == 1 else -math.log(1.0 - prob)
+
+class OnlineLearner(object):
+    def __init__(self, coefficients, intercept, publish, learning_rate=0.01, max_step=0.1,
+                 swap_seconds=30.0, rollback_threshold=0.1, window=500, max_pending=10000):
+        self.baseline = (list(coefficients), intercept)
+        self.coefficients = list(coefficients)
+        self.intercept = intercept
+        self.publish = publish
+        self.learning_rate = learning_rate
+        self.max_step = max_step
+        self.swap_seconds = swap_seconds
+        self.rollback_threshold = rollback_threshold
+        self.queue = Queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+
+        self.baseline_losses = collections.deque(maxlen=window)
+        self.shadow_losses = collections.deque(maxlen=window)
+        self.started_at = time.time()
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.applied = 0
+        self.applied_at_swap = 0
+        self.swaps = 0
+        self.rollbacks = 0
+        self.last_swap = time.time()
+
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        worker.start()
+
+    def submit(self, features, label):
+        """Queues one labeled record; returns False if it was dropped."""
+        with self.lock:
+            self.received += 1
+        try:
+            self.queue.put_nowait((features, label))
+            return True
+        except Queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def _worker(self):
+        while True:
+            timeout = max(0.0, self.last_swap + self.swap_seconds - time.time())
+            try:
+                features, label = self.queue.get(timeout=timeout)
+            except Queue.Empty:
+                self._swap()
+                continue
+            if len(features) != len(self.coefficients) or label not in (0, 1):
+                with self.lock:
+                    self.rejected += 1
+                continue
+            self._apply(features, label)
+            if time.time() - self.last_swap >= self.swap_seconds:
+                self._swap()
+
+    def _apply(self, features, label):
+        baseline_prob = predict_proba(features, *self.baseline)
+        # sgd_update returns the error before the step: a prequential score
+        self.intercept, error = sgd_update(self.coefficients, self.intercept, features, label,
+                                           self.learning_rate, max_step=self.max_step)
+        with self.lock:
+            self.baseline_losses.append(_log_loss(baseline_prob, label))
+            self.shadow_losses.append(_log_loss(label - error, label))
+            self.applied += 1
+
+    def _swap(self):
+        with self.lock:
+            self.last_swap = time.time()
+            if self.applied == self.applied_at_swap:
+                return
+            self.applied_at_swap = self.applied
+            baseline_loss, shadow_loss = self._window_losses()
+            rollback = (bool(self.shadow_losses) and
+                        shadow_loss > baseline_loss * (1.0 + self.rollback_threshold))
+            if rollback:
+                self.rollbacks += 1
+                self.shadow_losses.clear()
+                self.baseline_losses.clear()
+            else:
+                self.swaps += 1
+        if rollback:
+            self.coefficients = list(self.baseline[0])
+            self.intercept = self.baseline[1]
+        self.publish(list(self.coefficients), self.intercept)
+
+    def _window_losses(self):
+        n = len(self.shadow_losses)
+        if not n:
+            return 0.0, 0.0
+        return sum(self.baseline_losses) / n, sum(self.shadow_losses) / n
+
+    def stats(self):
+        with self.lock:
+            baseline_loss, shadow_loss = self._window_losses()
+            elapsed = time.time() - self.started_at
+            return {
+                'received': self.received,
+                'applied': self.applied,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+                'pending': self.queue.qsize(),
+                'updates_per_sec': self.applied / elapsed if elapsed else 0.0,
+                'swaps': self.swaps,
+                'rollbacks': self.rollbacks,
+                'seconds_since_swap': time.time() - self.last_swap,
+                'updates_not_live': self.applied - self.applied_at_swap,
+                'window_log_loss': shadow_loss,
+                'baseline_window_log_loss': baseline_loss,
+                'rollback_threshold': self.rollback_threshold
+            }
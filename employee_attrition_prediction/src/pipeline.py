@@ -0,0 +1,228 @@
+"""
+Generate -> train -> reports/scores pipeline with content-hash stage caching.
+
+Each stage declares its command, its inputs (code, upstream artifacts) and
+its outputs. A stage's key is the SHA-256 of its command and the contents
+of its inputs; when the outputs on disk were produced under the same key
+the stage is skipped, and when another run cached outputs for that key
+they are restored from .pipeline_cache/ instead of recomputed. Stages whose
+upstreams are done run in parallel. File hashes are remembered by (size,
+mtime), so a no-op rerun only stats files. Run from src/:
+
+    python pipeline.py
+    python pipeline.py --train-args="--l1 0.01" --jobs 2
+    python pipeline.py --force train
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+CACHE_DIR = '.pipeline_cache'
+STATE_FILE = os.path.join(CACHE_DIR, 'state.json')
+
+def build_stages(python, train_args):
+    # Inputs list the code each command imports as well as upstream outputs
+    return [
+        {'name': 'generate', 'after': [],
+         'cmd': [python, 'generate_data.py'],
+         'inputs': ['generate_data.py'],
+         'outputs': ['synthetic_attrition_data.csv']},
+        {'name': 'train', 'after': ['generate'],
+         'cmd': [python, 'train_model.py'] + train_args,
+         'inputs': ['train_model.py', 'artifacts.py', 'profiling.py', 'model_registry.py',
+                    'synthetic_attrition_data.csv'],
+         'outputs': ['model_artifacts.json', 'confusion_matrix.svg', 'feature_importance.svg']},
+        {'name': 'reports', 'after': ['train'],
+         'cmd': [python, 'cohort_reports.py'],
+         'inputs': ['cohort_reports.py', 'train_model.py', 'artifacts.py', 'profiling.py',
+                    'synthetic_attrition_data.csv', 'model_artifacts.json'],
+         'outputs': ['reports']},
+        {'name': 'scores', 'after': ['train'],
+         'cmd': [python, 'score_store.py', 'refresh', '--row-ids'],
+         'inputs': ['score_store.py', 'train_model.py', 'artifacts.py', 'profiling.py',
+                    'synthetic_attrition_data.csv', 'model_artifacts.json'],
+         'outputs': ['scores.db']},
+    ]
+
+class FileHasher(object):
+    """SHA-256 of files and directory trees, memoized by (size, mtime)."""
+
+    def __init__(self, memo):
+        self.memo = memo
+
+    def file_digest(self, path):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime]
+        cached = self.memo.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), ''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self.memo[path] = [stamp, digest]
+        return digest
+
+    def digest(self, path):
+        """Digest of a file or directory, None if it does not exist."""
+        if os.path.isfile(path):
+            return self.file_digest(path)
+        if not os.path.isdir(path):
+            return None
+        sha = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                sha.update(os.path.relpath(file_path, path))
+                sha.update(self.file_digest(file_path))
+        return sha.hexdigest()
+
+def stage_key(stage, hasher):
+    sha = hashlib.sha256(json.dumps(stage['cmd'][1:]))
+    for path in stage['inputs']:
+        sha.update(path)
+        sha.update(hasher.digest(path) or 'missing')
+    return sha.hexdigest()
+
+def copy_path(src, dst):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'stages': {}, 'hashes': {}}
+    with open(STATE_FILE, 'r') as f:
+        return json.load(f)
+
+def save_state(state):
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.rename(tmp_path, STATE_FILE)
+
+def check_cache(stage, key, state, hasher):
+    """'fresh' if the outputs on disk came from `key`, 'cached' if restorable, else None."""
+    record = state['stages'].get(stage['name'])
+    if record and record['key'] == key and all(
+            hasher.digest(path) == record['outputs'].get(path) for path in stage['outputs']):
+        return 'fresh'
+    if os.path.isdir(os.path.join(CACHE_DIR, 'objects', key)):
+        return 'cached'
+    return None
+
+def restore(stage, key):
+    for path in stage['outputs']:
+        copy_path(os.path.join(CACHE_DIR, 'objects', key, path), path)
+
+def store(stage, key):
+    # Copy into a temp dir first so a partial copy is never a cache hit
+    target = os.path.join(CACHE_DIR, 'objects', key)
+    tmp_target = target + '.tmp'
+    if os.path.isdir(tmp_target):
+        shutil.rmtree(tmp_target)
+    os.makedirs(tmp_target)
+    for path in stage['outputs']:
+        copy_path(path, os.path.join(tmp_target, path))
+    if not os.path.isdir(target):
+        os.rename(tmp_target, target)
+    else:
+        shutil.rmtree(tmp_target)
+
+def run_pipeline(stages, jobs=2, force=(), cache_outputs=True):
+    """Runs the stages in dependency order; returns False if one failed."""
+    for path in (CACHE_DIR, os.path.join(CACHE_DIR, 'logs')):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    state = load_state()
+    hasher = FileHasher(state['hashes'])
+    done, failed = set(), set()
+    running = {}
+    pending = list(stages)
+
+    def finish(stage, key, status, elapsed):
+        if status != 'failed':
+            state['stages'][stage['name']] = {
+                'key': key,
+                'outputs': dict((path, hasher.digest(path)) for path in stage['outputs'])
+            }
+            save_state(state)
+            done.add(stage['name'])
+        else:
+            failed.add(stage['name'])
+        print "{:<10} {:<9} {:>8.2f}s".format(stage['name'], status, elapsed)
+
+    while pending or running:
+        for stage in list(pending):
+            if any(dep in failed for dep in stage['after']):
+                pending.remove(stage)
+                failed.add(stage['name'])
+                print "{:<10} {:<9}".format(stage['name'], 'skipped')
+                continue
+            if not all(dep in done for dep in stage['after']) or len(running) >= jobs:
+                continue
+            pending.remove(stage)
+            start = time.time()
+            # Upstream outputs are final here, so the key covers them
+            key = stage_key(stage, hasher)
+            status = None if stage['name'] in force else check_cache(stage, key, state, hasher)
+            if status == 'cached':
+                restore(stage, key)
+                status = 'restored'
+            if status is not None:
+                finish(stage, key, status, time.time() - start)
+                continue
+            log = open(os.path.join(CACHE_DIR, 'logs', stage['name'] + '.log'), 'w')
+            process = subprocess.Popen(stage['cmd'], stdout=log, stderr=subprocess.STDOUT)
+            running[stage['name']] = (stage, key, process, log, start)
+
+        for name, (stage, key, process, log, start) in list(running.items()):
+            if process.poll() is None:
+                continue
+            del running[name]
+            log.close()
+            if process.returncode == 0:
+                if cache_outputs:
+                    store(stage, key)
+                finish(stage, key, 'ran', time.time() - start)
+            else:
+                finish(stage, key, 'failed', time.time() - start)
+                with open(log.name, 'r') as f:
+                    sys.stdout.write(f.read())
+        if running:
+            time.sleep(0.05)
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--jobs', type=int, default=2, help="stages run at the same time")
+    parser.add_argument('--train-args', default='',
+                        help="extra train_model.py flags, part of the train stage's key")
+    parser.add_argument('--stages', nargs='+', help="run only these stages (and need their upstreams done)")
+    parser.add_argument('--force', nargs='*', default=[], help="rerun these stages regardless of cache")
+    parser.add_argument('--no-cache-outputs', action='store_true',
+                        help="do not keep copies of outputs for restoring later")
+    args = parser.parse_args()
+
+    stages = build_stages(sys.executable, args.train_args.split())
+    if args.stages:
+        stages = [s for s in stages if s['name'] in args.stages]
+        for s in stages:
+            s['after'] = [dep for dep in s['after'] if dep in args.stages]
+
+    start = time.time()
+    ok = run_pipeline(stages, args.jobs, args.force, not args.no_cache_outputs)
+    print "Pipeline {} in {:.2f}s".format('finished' if ok else 'FAILED', time.time() - start)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,164 @@
+"""
+Opt-in profiling for train_model.py and serve_model.py.
+
+Profiler(enabled=False) hands out a shared no-op context manager from
+stage(), so instrumented code pays one attribute check when profiling is
+off. When enabled it records:
+
+- per-stage wall time and growth of peak RSS
+- cProfile stats for the thread that called start() (PREFIX.prof)
+- wall-clock stack samples of every thread in collapsed-stack format
+  (PREFIX.collapsed), ready for flamegraph.pl or speedscope
+- top allocating lines via tracemalloc when it is importable (Python 3,
+  or the pytracemalloc backport on Python 2)
+"""
+import cProfile
+import json
+import resource
+import sys
+import thread
+import threading
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage(object):
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.rss = peak_rss_mb()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.timings.append({
+            'stage': self.name,
+            'seconds': time.time() - self.start,
+            'peak_rss_growth_mb': peak_rss_mb() - self.rss
+        })
+        return False
+
+class StackSampler(object):
+    """Samples the stacks of all threads from a background thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = {}
+        self.running = False
+
+    def start(self):
+        self.running = True
+        sampler = threading.Thread(target=self._run)
+        sampler.daemon = True
+        sampler.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        own_id = thread.get_ident()
+        while self.running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("{}:{}".format(code.co_filename.split('/')[-1], code.co_name))
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            time.sleep(self.interval)
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write("{} {}\n".format(stack, count))
+
+class RequestTrace(object):
+    """Per-request timing breakdown, rendered as a Server-Timing header."""
+
+    def __init__(self):
+        self.last = time.time()
+        self.parts = []
+
+    def mark(self, name):
+        now = time.time()
+        self.parts.append((name, now - self.last))
+        self.last = now
+
+    def header(self):
+        return ', '.join("{};dur={:.3f}".format(name, seconds * 1000)
+                         for name, seconds in self.parts)
+
+class Profiler(object):
+    def __init__(self, enabled=False, prefix='profile', interval=0.005, top_allocators=10):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.top_allocators = top_allocators
+        self.timings = []
+        self.cprofile = cProfile.Profile() if enabled else None
+        self.sampler = StackSampler(interval) if enabled else None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def start(self):
+        if not self.enabled:
+            return
+        if tracemalloc is not None:
+            tracemalloc.start()
+        self.sampler.start()
+        self.cprofile.enable()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.cprofile.disable()
+        self.sampler.stop()
+
+        self.cprofile.dump_stats(self.prefix + '.prof')
+        self.sampler.write(self.prefix + '.collapsed')
+
+        allocators = []
+        if tracemalloc is not None:
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.statistics('lineno')[:self.top_allocators]:
+                frame = stat.traceback[0]
+                allocators.append({'location': "{}:{}".format(frame.filename, frame.lineno),
+                                   'size_kb': stat.size / 1024.0, 'count': stat.count})
+            tracemalloc.stop()
+
+        with open(self.prefix + '_stages.json', 'w') as f:
+            json.dump({'stages': self.timings, 'top_allocators': allocators}, f, indent=2)
+
+        print "\nProfile ({}.prof, {}.collapsed, {}_stages.json):".format(
+            self.prefix, self.prefix, self.prefix)
+        total = sum(t['seconds'] for t in self.timings) or 1.0
+        for t in self.timings:
+            print "  {:<16} {:>8.3f}s {:>6.1%} {:>+8.1f} MB peak".format(
+                t['stage'], t['seconds'], t['seconds'] / total, t['peak_rss_growth_mb'])
+        if tracemalloc is None:
+            print "  (tracemalloc unavailable; memory is peak RSS growth per stage)"
+        for a in allocators:
+            print "  {:>10.1f} KB {:>8} blocks  {}".format(a['size_kb'], a['count'], a['location'])
@@ -0,0 +1,211 @@
+"""
+Persistent per-employee risk scores with incremental rescoring.
+
+Scores live in a SQLite file keyed by employee id (primary key index), with
+the probability, the model version (SHA-256 of model_artifacts.json), the
+top contributing features and a hash of the employee's raw feature values.
+`refresh` streams an HR extract and rescores only employees whose feature
+hash changed, plus everyone when the model version changed; unchanged rows
+cost one hash. Employees missing from the extract are deleted. Run from src/:
+
+    python score_store.py refresh --data hr_extract.csv --id-column EMPLOYEE_ID
+    python score_store.py get 1042
+    python score_store.py benchmark
+
+The synthetic data has no id column; `refresh --row-ids` keys it by row
+number instead, which only works while the extract keeps its row order
+(any reordering looks like every employee changed).
+"""
+import argparse
+import csv
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+from train_model import load_model_artifacts, transform_row, predict_proba
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    employee_id TEXT PRIMARY KEY,
+    probability REAL NOT NULL,
+    model_version TEXT NOT NULL,
+    contributors TEXT NOT NULL,
+    feature_hash INTEGER NOT NULL,
+    scored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def model_version(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def feature_hash(values):
+    # crc32 of the raw values is enough to notice an edited record
+    return zlib.crc32('\x1f'.join(values))
+
+def top_contributors(x, features, active, coefficients, k=3):
+    contributions = [(coefficients[i] * x[i], i) for i in active if x[i] != 0.0]
+    contributions.sort(key=lambda c: -abs(c[0]))
+    return [[features[i], round(value, 6)] for value, i in contributions[:k]]
+
+class ScoreStore(object):
+    """
+    Point lookups from any thread; each thread gets its own read connection
+    since sqlite3 connections cannot be shared across threads.
+    """
+
+    def __init__(self, path='scores.db'):
+        self.path = path
+        self.local = threading.local()
+        db = self.connection()
+        db.executescript(SCHEMA)
+        db.commit()
+
+    def connection(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path)
+        return db
+
+    def get(self, employee_id):
+        row = self.connection().execute(
+            "SELECT probability, model_version, contributors, scored_at FROM scores"
+            " WHERE employee_id = ?", (employee_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'employee_id': employee_id,
+            'probability': row[0],
+            'prediction': 1 if row[0] >= 0.5 else 0,
+            'model_version': row[1][:12],
+            'top_contributors': json.loads(row[2]),
+            'scored_at': row[3]
+        }
+
+    def refresh(self, data_path, artifacts_path, id_column=None, batch_size=5000):
+        """
+        Rescores changed employees and deletes those no longer in the extract;
+        returns counts of rescored, unchanged and deleted rows. Without
+        `id_column` employees are keyed by row number.
+        """
+        if id_column is None:
+            print "WARNING: no id column, keying {} by row number; reordered rows will be " \
+                  "rescored as changed employees".format(data_path)
+        artifacts = load_model_artifacts(artifacts_path)
+        encoder = artifacts.get('encoder')
+        if encoder is None:
+            raise ValueError("{} has no encoder; retrain with train_model.py".format(artifacts_path))
+        coefficients = artifacts['coefficients']
+        intercept = artifacts['intercept']
+        features = artifacts['features']
+        active = [i for i, c in enumerate(coefficients) if c != 0.0]
+        version = model_version(artifacts_path)
+
+        db = self.connection()
+        stored = db.execute("SELECT value FROM meta WHERE key = 'model_version'").fetchone()
+        full = stored is None or stored[0] != version
+        known = {} if full else dict(db.execute("SELECT employee_id, feature_hash FROM scores"))
+
+        # Ids seen in this extract; the rest are deleted afterwards
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (employee_id TEXT PRIMARY KEY)")
+        db.execute("DELETE FROM seen")
+
+        counts = {'rescored': 0, 'unchanged': 0, 'deleted': 0, 'full_rescore': full}
+        pending = []
+        seen = []
+        now = time.time()
+        with open(data_path, 'rb') as f:
+            reader = csv.reader(f)
+            headers = next(reader)
+            positions = [headers.index(col['name']) for col in encoder['columns']]
+            if id_column and id_column not in headers:
+                raise ValueError("{} has no id column {}".format(data_path, id_column))
+            id_pos = headers.index(id_column) if id_column else None
+            for row_number, row in enumerate(reader):
+                employee_id = row[id_pos] if id_pos is not None else str(row_number)
+                seen.append((employee_id,))
+                if len(seen) >= batch_size:
+                    self._mark_seen(db, seen)
+                    seen = []
+                values = [row[p] for p in positions]
+                digest = feature_hash(values)
+                if known.get(employee_id) == digest:
+                    counts['unchanged'] += 1
+                    continue
+                x = transform_row(encoder, values)
+                pending.append((employee_id, predict_proba(x, coefficients, intercept), version,
+                                json.dumps(top_contributors(x, features, active, coefficients)),
+                                digest, now))
+                if len(pending) >= batch_size:
+                    self._write(db, pending)
+                    counts['rescored'] += len(pending)
+                    pending = []
+        self._write(db, pending)
+        counts['rescored'] += len(pending)
+        self._mark_seen(db, seen)
+        counts['deleted'] = db.execute(
+            "DELETE FROM scores WHERE employee_id NOT IN (SELECT employee_id FROM seen)").rowcount
+        db.execute("DELETE FROM seen")
+        # Recorded last, so an interrupted full rescore is redone next time
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('model_version', ?)", (version,))
+        db.commit()
+        return counts
+
+    def _mark_seen(self, db, ids):
+        try:
+            db.executemany("INSERT INTO seen VALUES (?)", ids)
+        except sqlite3.IntegrityError:
+            raise ValueError("duplicate employee id in the extract")
+
+    def _write(self, db, rows):
+        db.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)", rows)
+        db.commit()
+
+    def count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--db', default='scores.db')
+    commands = parser.add_subparsers(dest='command')
+    refresh = commands.add_parser('refresh', help="rescore changed employees")
+    refresh.add_argument('--data', default='synthetic_attrition_data.csv')
+    refresh.add_argument('--artifacts', default='model_artifacts.json')
+    ids = refresh.add_mutually_exclusive_group(required=True)
+    ids.add_argument('--id-column', help="employee id column of the extract")
+    ids.add_argument('--row-ids', action='store_true',
+                     help="key employees by row number (extracts without an id column)")
+    get = commands.add_parser('get', help="look up one employee")
+    get.add_argument('employee_id')
+    bench = commands.add_parser('benchmark', help="time random point lookups")
+    bench.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    if args.command == 'refresh':
+        start = time.time()
+        counts = store.refresh(args.data, args.artifacts, args.id_column)
+        print "{} rescored, {} unchanged, {} deleted{} in {:.2f}s".format(
+            counts['rescored'], counts['unchanged'], counts['deleted'],
+            " (new model version)" if counts['full_rescore'] else "", time.time() - start)
+    elif args.command == 'get':
+        print json.dumps(store.get(args.employee_id), indent=2)
+    else:
+        ids = [row[0] for row in store.connection().execute("SELECT employee_id FROM scores")]
+        if not ids:
+            raise SystemExit("{} is empty; run refresh first".format(args.db))
+        timings = []
+        for _ in range(args.lookups):
+            employee_id = random.choice(ids)
+            start = time.time()
+            store.get(employee_id)
+            timings.append(time.time() - start)
+        timings.sort()
+        print "{} lookups over {} employees: mean {:.1f}us, p99 {:.1f}us".format(
+            len(timings), len(ids), sum(timings) / len(timings) * 1e6,
+            timings[int(0.99 * len(timings))] * 1e6)
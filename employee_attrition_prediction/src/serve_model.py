@@ -1,15 +1,73 @@
 import BaseHTTPServer
+import Queue
+import SocketServer
+import argparse
 import json
 import math
+import operator
+import random
+import threading
+import urllib
+
+import wire_format
+from admission import AdmissionController, Rejected
+from batch_jobs import JobManager
+from coalescer import RequestCoalescer
+from model_registry import ModelRegistry, ModelStore
+from online_learning import OnlineLearner
+from profiling import Profiler, RequestTrace
+from score_store import ScoreStore
+from train_model import load_model_artifacts, prune_coefficients
+
+def load_artifacts(filename):
+    artifacts = load_model_artifacts(filename)
+    return artifacts['coefficients'], artifacts['intercept'], artifacts['features']
+
+def load_encoder(filename):
+    # Encoder saved by train_model.py; older artifacts do not have one
+    return load_model_artifacts(filename).get('encoder')
 
 # Load Model Artifacts
 print "Loading model..."
-with open('model_artifacts.json', 'r') as f:
-    artifacts = json.load(f)
+coefficients, intercept, feature_names = load_artifacts('model_artifacts.json')
+# Scoring only looks up the non-zero weights, so pruned features cost nothing
+active_index, active_weights = prune_coefficients(coefficients)
+# Scoring reads this one tuple, so a model swap (install_model) is atomic
+live_model = (active_index, active_weights, intercept)
+
+# Candidate model scored in shadow mode (see ShadowScorer), None when disabled
+shadow = None
+
+# Micro-batching layer for /predict (see coalescer.py), None when disabled
+coalescer = None
+
+# Background batch scoring (see batch_jobs.py), None when disabled
+jobs = None
+
+# Per-segment models (see model_registry.py), None when disabled; requests
+# without a segment are scored by the model above
+store = None
+
+# Concurrency limit, bounded queue, rate limits and deadlines for the scoring
+# endpoints (see admission.py), None when disabled
+admission = None
+
+# Learns from POST /feedback labels (see online_learning.py), None when disabled
+learner = None
 
-coefficients = artifacts['coefficients']
-intercept = artifacts['intercept']
-feature_names = artifacts['features']
+# Precomputed per-employee scores (see score_store.py), None when disabled
+scores = None
+
+# Peers (reverse proxies) allowed to name the client in X-Client-Id for rate
+# limiting (--trusted-proxy); everyone else is limited by their address
+trusted_proxies = frozenset()
+
+# Largest request body, before or after gzip decoding (--max-request-mb)
+max_request_bytes = 10 * 1024 * 1024
+
+# Replaced by an enabled Profiler with --profile; clients then opt in to a
+# Server-Timing breakdown per request with an "X-Trace: 1" header
+profiler = Profiler()
 
 def sigmoid(z):
     try:
@@ -17,6 +75,9 @@ def sigmoid(z):
     except OverflowError:
         return 0.0 if z < 0 else 1.0
 
+def score_active(features, index, weights, bias):
+    return sigmoid(bias + sum(map(operator.mul, weights, map(features.__getitem__, index))))
+
 def predict_proba(features):
     z = intercept
     # We expect features to be a list of values matching feature_names order
@@ -47,46 +108,440 @@ def predict_proba(features):
     # OR we just do a dot product if lengths match.
     
     if len(features) == len(coefficients):
-        for i in range(len(features)):
-            z += coefficients[i] * features[i]
+        return score_active(features, *live_model)
     else:
         # Fallback/Error
         return 0.5
-        
-    return sigmoid(z)
+
+def predict_proba_batch(rows):
+    # One pass over a micro-batch; rows with the wrong width get the same
+    # 0.5 fallback as predict_proba
+    n_features = len(coefficients)
+    index, weights, bias = live_model
+    probs = []
+    for row in rows:
+        if len(row) == n_features:
+            probs.append(score_active(row, index, weights, bias))
+        else:
+            probs.append(0.5)
+    return probs
+
+def install_model(coefs, bias):
+    """Replaces the live model; requests in flight finish on the old one."""
+    global coefficients, intercept, active_index, active_weights, live_model
+    index, weights = prune_coefficients(coefs)
+    live_model = (index, weights, bias)
+    coefficients, intercept, active_index, active_weights = coefs, bias, index, weights
+
+def predict_proba_model(model, rows):
+    # Same as predict_proba_batch for a model from the registry store
+    probs = []
+    for row in rows:
+        if len(row) == model.n_features:
+            probs.append(score_active(row, model.active_index, model.active_weights,
+                                      model.intercept))
+        else:
+            probs.append(0.5)
+    return probs
+
+# --- Shadow / Canary Scoring ---
+
+class ShadowScorer(object):
+    """
+    Scores a sampled fraction of live requests with a candidate model.
+
+    Sampled requests are handed to a background thread through a bounded
+    queue, so the primary response never waits on the candidate. When the
+    queue is full the sample is dropped rather than blocking the caller.
+    """
+
+    def __init__(self, coefs, bias, fraction=0.1, max_pending=1000):
+        self.coefficients = coefs
+        self.active_index, self.active_weights = prune_coefficients(coefs)
+        self.intercept = bias
+        self.fraction = fraction
+        self.queue = Queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.reset()
+
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        worker.start()
+
+    def reset(self):
+        with self.lock:
+            self.seen = 0
+            self.dropped = 0
+            self.scored = 0
+            self.disagreements = 0
+            self.sum_delta = 0.0
+            self.sum_abs_delta = 0.0
+            self.sum_sq_delta = 0.0
+            self.max_abs_delta = 0.0
+
+    def submit(self, features, primary_prob):
+        with self.lock:
+            self.seen += 1
+        if random.random() >= self.fraction:
+            return
+        try:
+            self.queue.put_nowait((features, primary_prob))
+        except Queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _worker(self):
+        while True:
+            features, primary_prob = self.queue.get()
+            if len(features) != len(self.coefficients):
+                continue
+            candidate_prob = score_active(features, self.active_index, self.active_weights,
+                                          self.intercept)
+            self.record(primary_prob, candidate_prob)
+
+    def record(self, primary_prob, candidate_prob):
+        delta = candidate_prob - primary_prob
+        with self.lock:
+            self.scored += 1
+            if (primary_prob >= 0.5) != (candidate_prob >= 0.5):
+                self.disagreements += 1
+            self.sum_delta += delta
+            self.sum_abs_delta += abs(delta)
+            self.sum_sq_delta += delta * delta
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+
+    def summary(self):
+        with self.lock:
+            n = self.scored
+            return {
+                'fraction': self.fraction,
+                'requests_seen': self.seen,
+                'scored': n,
+                'dropped': self.dropped,
+                'pending': self.queue.qsize(),
+                'disagreement_rate': float(self.disagreements) / n if n else 0.0,
+                'mean_delta': self.sum_delta / n if n else 0.0,
+                'mean_abs_delta': self.sum_abs_delta / n if n else 0.0,
+                'rmse_delta': math.sqrt(self.sum_sq_delta / n) if n else 0.0,
+                'max_abs_delta': self.max_abs_delta
+            }
+
+def load_candidate(filename, fraction):
+    cand_coefficients, cand_intercept, cand_features = load_artifacts(filename)
+    # Clients send the encoded vector, so both models must share one layout
+    if cand_features != feature_names:
+        raise ValueError("Candidate model features do not match the primary model")
+    print "Shadow scoring {:.0%} of requests with {}".format(fraction, filename)
+    return ShadowScorer(cand_coefficients, cand_intercept, fraction)
 
 class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def send_json(self, status, payload, retry_after=None):
+        body = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_body(self, status, content_type, body, trace=None):
+        # Gzip only when the client accepts it and the body is worth it
+        gzipped = (len(body) >= wire_format.MIN_GZIP_BYTES and
+                   wire_format.accepts_gzip(self.headers.getheader('accept-encoding')))
+        if gzipped:
+            body = wire_format.gzip_bytes(body)
+            if trace is not None:
+                trace.mark('compress')
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        if trace is not None:
+            self.send_header('Server-Timing', trace.header())
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/shadow':
+            if shadow is None:
+                self.send_json(404, {'error': 'shadow scoring is not enabled'})
+            else:
+                self.send_json(200, shadow.summary())
+        elif self.path == '/coalescer':
+            if coalescer is None:
+                self.send_json(404, {'error': 'request coalescing is not enabled'})
+            else:
+                self.send_json(200, coalescer.stats())
+        elif self.path == '/models':
+            if store is None:
+                self.send_json(404, {'error': 'segment routing is not enabled'})
+            else:
+                self.send_json(200, store.stats())
+        elif self.path == '/feedback':
+            if learner is None:
+                self.send_json(404, {'error': 'online learning is not enabled'})
+            else:
+                self.send_json(200, learner.stats())
+        elif self.path == '/admission':
+            if admission is None:
+                self.send_json(404, {'error': 'admission control is not enabled'})
+            else:
+                self.send_json(200, admission.stats())
+        elif self.path.startswith('/scores/'):
+            if scores is None:
+                self.send_json(404, {'error': 'the score store is not enabled'})
+                return
+            record = scores.get(urllib.unquote(self.path[len('/scores/'):]))
+            if record is None:
+                self.send_json(404, {'error': 'unknown employee'})
+            else:
+                self.send_json(200, record)
+        elif self.path.startswith('/jobs/'):
+            self.job_request(lambda job_id: jobs.get(job_id))
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def do_DELETE(self):
+        if self.path.startswith('/jobs/'):
+            self.job_request(lambda job_id: jobs.cancel(job_id))
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def job_request(self, action):
+        if jobs is None:
+            self.send_json(404, {'error': 'batch jobs are not enabled'})
+            return
+        job = action(self.path[len('/jobs/'):])
+        if job is None:
+            self.send_json(404, {'error': 'unknown job'})
+        else:
+            self.send_json(200, job.to_dict())
+
+    def submit_job(self):
+        content_length = int(self.headers.getheader('content-length', 0))
+        if content_length > jobs.max_upload_bytes:
+            # Refused before reading; the connection closes after the response
+            self.send_json(413, {'error': 'request body over {} bytes'.format(
+                jobs.max_upload_bytes)})
+            return
+        try:
+            if self.headers.getheader('content-type', '').startswith('text/csv'):
+                # Uploaded extract, streamed to disk; the id column (if any) comes in a header
+                job = jobs.submit(upload=self.rfile, upload_bytes=content_length,
+                                  id_column=self.headers.getheader('X-Id-Column'))
+            else:
+                data = json.loads(self.rfile.read(content_length))
+                job = jobs.submit(input_path=data.get('input'), id_column=data.get('id_column'))
+            self.send_json(202, job.to_dict())
+        except Exception as e:
+            self.send_json(400, {'error': str(e)})
+
+    def read_body(self):
+        # Oversized bodies are refused unread; the connection closes after the 413
+        content_length = int(self.headers.getheader('content-length', 0))
+        if content_length > max_request_bytes:
+            raise wire_format.PayloadTooLarge(
+                "request body over {} bytes".format(max_request_bytes))
+        return self.rfile.read(content_length)
+
+    def decode_rows(self, body, single=False):
+        return wire_format.decode_rows(body, self.headers.getheader('content-type'),
+                                       self.headers.getheader('content-encoding'), single,
+                                       max_request_bytes)
+
+    def submit_shadow(self, rows, probs):
+        # The response is already written, so a failure here must not reach
+        # the handler's error path and send a second status line
+        try:
+            for features, prob in zip(rows, probs):
+                shadow.submit(features, prob)
+        except Exception as e:
+            print "Shadow scoring failed: {}".format(e)
+
+    def route(self, segment):
+        """Registry model for the request's segment, None for the default model."""
+        segment = segment or self.headers.getheader('X-Segment')
+        if not segment:
+            return None
+        if store is None:
+            raise LookupError("segment routing is not enabled (start with --registry)")
+        model = store.get(segment)
+        if model is None:
+            raise LookupError("no model registered for segment {}".format(segment))
+        return model
+
+    def predict_batch(self):
+        try:
+            content_type = self.headers.getheader('content-type')
+            rows, segment = self.decode_rows(self.read_body())
+            model = self.route(segment)
+            self.check_deadline()
+            # One pass for the whole batch; the coalescer is for single records
+            if model is not None:
+                probs = predict_proba_model(model, rows)
+            else:
+                probs = predict_proba_batch(rows)
+            binary = wire_format.wants_binary(self.headers.getheader('accept'), content_type)
+            response_type, body = wire_format.encode_probabilities(probs, binary)
+            self.send_body(200, response_type, body)
+
+            if shadow is not None and model is None:
+                self.submit_shadow(rows, probs)
+        except Rejected as rejection:
+            self.send_json(rejection.status, {'error': str(rejection)}, rejection.retry_after)
+        except wire_format.PayloadTooLarge as e:
+            self.send_json(413, {'error': str(e)})
+        except LookupError as e:
+            self.send_json(404, {'error': str(e)})
+        except Exception as e:
+            self.send_json(400, {'error': str(e)})
+
+    def feedback(self):
+        try:
+            data = json.loads(self.read_body())
+            records = data.get('records', [data])
+            accepted = 0
+            for record in records:
+                if learner.submit(record['features'], record['label']):
+                    accepted += 1
+            # Updates are applied in the background, never on this thread
+            self.send_json(202, {'accepted': accepted, 'dropped': len(records) - accepted})
+        except wire_format.PayloadTooLarge as e:
+            self.send_json(413, {'error': str(e)})
+        except Exception as e:
+            self.send_json(400, {'error': str(e)})
+
+    def reject(self, rejection):
+        # Drain the body so the client reads the response, not a reset
+        # (oversized bodies are left unread; the connection closes anyway)
+        content_length = int(self.headers.getheader('content-length', 0))
+        if content_length <= max_request_bytes:
+            self.rfile.read(content_length)
+        self.send_json(rejection.status, {'error': str(rejection)}, rejection.retry_after)
+
     def do_POST(self):
+        self.deadline = None
+        if admission is None or self.path not in ('/predict', '/predict/batch'):
+            self.handle_post()
+            return
+        try:
+            self.deadline = admission.deadline(self.headers.getheader('X-Request-Deadline-Ms'))
+            started = admission.acquire(self.client_id(), self.deadline)
+        except Rejected as rejection:
+            self.reject(rejection)
+            return
+        try:
+            self.handle_post()
+        finally:
+            admission.release(started)
+
+    def client_id(self):
+        # A client naming itself could send a fresh id per request and never
+        # be rate limited, so only a trusted proxy's header counts
+        peer = self.client_address[0]
+        if peer in trusted_proxies:
+            return self.headers.getheader('X-Client-Id') or peer
+        return peer
+
+    def check_deadline(self):
+        # Expired requests are dropped after parsing, before any scoring
+        if admission is not None:
+            admission.check_deadline(self.deadline)
+
+    def handle_post(self):
         if self.path == '/predict':
-            content_length = int(self.headers.getheader('content-length', 0))
-            post_data = self.rfile.read(content_length)
-            
+            trace = None
+            if profiler.enabled and self.headers.getheader('X-Trace'):
+                trace = RequestTrace()
+
             try:
-                data = json.loads(post_data)
-                features = data.get('features', [])
+                post_data = self.read_body()
+                if trace is not None:
+                    trace.mark('read')
+                content_type = self.headers.getheader('content-type')
+                rows, segment = self.decode_rows(post_data, single=True)
+                features = rows[0]
+                model = self.route(segment)
+                self.check_deadline()
+                if trace is not None:
+                    trace.mark('parse')
                 
-                prob = predict_proba(features)
+                if model is not None:
+                    prob = predict_proba_model(model, rows)[0]
+                elif coalescer is not None:
+                    prob = coalescer.submit(features)
+                else:
+                    prob = predict_proba(features)
                 prediction = 1 if prob >= 0.5 else 0
+                if trace is not None:
+                    trace.mark('score')
                 
-                response = {
-                    'prediction': prediction,
-                    'probability': prob,
-                    'status': 'success'
-                }
+                if wire_format.wants_binary(self.headers.getheader('accept'), content_type):
+                    response_type, body = wire_format.encode_probabilities([prob], True)
+                else:
+                    response = {
+                        'prediction': prediction,
+                        'probability': prob,
+                        'status': 'success'
+                    }
+                    if model is not None:
+                        response['model'] = model.digest[:12]
+                    response_type, body = wire_format.JSON_TYPE, json.dumps(response)
+                if trace is not None:
+                    trace.mark('serialize')
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response))
+                self.send_body(200, response_type, body, trace)
+
+                if shadow is not None and model is None:
+                    self.submit_shadow(rows, [prob])
                 
+            except Rejected as rejection:
+                self.send_json(rejection.status, {'error': str(rejection)}, rejection.retry_after)
+            except wire_format.PayloadTooLarge as e:
+                self.send_json(413, {'error': str(e)})
+            except LookupError as e:
+                self.send_json(404, {'error': str(e)})
             except Exception as e:
-                self.send_response(400)
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': str(e)}))
+                self.send_json(400, {'error': str(e)})
+        elif self.path == '/predict/batch':
+            self.predict_batch()
+        elif self.path == '/feedback':
+            if learner is None:
+                self.send_json(404, {'error': 'online learning is not enabled'})
+            else:
+                self.feedback()
+        elif self.path == '/jobs':
+            if jobs is None:
+                self.send_json(404, {'error': 'batch jobs are not enabled'})
+            else:
+                self.submit_job()
+        elif self.path == '/models/reload':
+            if store is None:
+                self.send_json(404, {'error': 'segment routing is not enabled'})
+            else:
+                store.registry.reload()
+                self.send_json(200, store.stats())
+        elif self.path == '/shadow/reset':
+            if shadow is None:
+                self.send_json(404, {'error': 'shadow scoring is not enabled'})
+            else:
+                shadow.reset()
+                self.send_json(200, {'status': 'success'})
         else:
             self.send_response(404)
             self.end_headers()
 
+class ThreadedHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    # Concurrent requests are what the coalescer batches together
+    daemon_threads = True
+    # Accept bursts promptly so admission control, not the kernel, decides
+    request_queue_size = 128
+
 def run(server_class=BaseHTTPServer.HTTPServer, handler_class=RequestHandler, port=8000):
     server_address = ('', port)
     httpd = server_class(server_address, handler_class)
@@ -94,4 +549,114 @@ def run(server_class=BaseHTTPServer.HTTPServer, handler_class=RequestHandler, po
     httpd.serve_forever()
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Attrition model inference server")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-request-mb', type=float, default=10,
+                        help="largest request body, also after gzip decoding (413 above it)")
+    parser.add_argument('--candidate', help="candidate model_artifacts.json to score in shadow mode")
+    parser.add_argument('--shadow-fraction', type=float, default=0.1,
+                        help="fraction of /predict requests also scored by the candidate")
+    parser.add_argument('--coalesce', action='store_true',
+                        help="batch concurrent /predict requests before scoring (no "
+                             "throughput gain with this row-by-row scorer)")
+    parser.add_argument('--coalesce-max-batch', type=int, default=32)
+    parser.add_argument('--coalesce-window-us', type=int, default=500)
+    parser.add_argument('--profile', action='store_true',
+                        help="sample stacks, allow X-Trace request timings; written on Ctrl+C")
+    parser.add_argument('--profile-output', default='serve_profile',
+                        help="file prefix for --profile output")
+    parser.add_argument('--batch-jobs', action='store_true',
+                        help="enable the /jobs batch scoring endpoints")
+    parser.add_argument('--job-workers', type=int, default=1,
+                        help="batch jobs scored at the same time, one process each")
+    parser.add_argument('--jobs-dir', default='jobs', help="uploads and job results")
+    parser.add_argument('--job-chunk-size', type=int, default=1000)
+    parser.add_argument('--jobs-data-dir',
+                        help="directory job inputs may be read from (uploads only without it)")
+    parser.add_argument('--job-max-upload-mb', type=float, default=100,
+                        help="largest CSV upload accepted by POST /jobs")
+    parser.add_argument('--job-ttl-minutes', type=float, default=60,
+                        help="finished jobs and their files are removed after this long")
+    parser.add_argument('--registry', help="model registry directory for per-segment routing")
+    parser.add_argument('--registry-memory-mb', type=float, default=64,
+                        help="memory budget for loaded segment models (LRU evicted)")
+    parser.add_argument('--score-store',
+                        help="scores.db from score_store.py, served at GET /scores/<employee_id>")
+    parser.add_argument('--max-concurrent', type=int,
+                        help="enable admission control: requests scored at the same time")
+    parser.add_argument('--max-queue', type=int, default=16,
+                        help="requests waiting for a slot before new ones get 503")
+    parser.add_argument('--rate-limit', type=float, help="requests/s per client (token bucket)")
+    parser.add_argument('--rate-burst', type=int, help="token bucket size, default the rate")
+    parser.add_argument('--trusted-proxy', action='append', default=[],
+                        help="proxy address whose X-Client-Id header names the client")
+    parser.add_argument('--default-deadline-ms', type=float,
+                        help="deadline for requests without an X-Request-Deadline-Ms header")
+    parser.add_argument('--online-learning', action='store_true',
+                        help="learn from POST /feedback labels and swap the live model periodically")
+    parser.add_argument('--online-learning-rate', type=float, default=0.01)
+    parser.add_argument('--online-max-step', type=float, default=0.1,
+                        help="bound on any coefficient's change in a single update")
+    parser.add_argument('--online-swap-seconds', type=float, default=30.0)
+    parser.add_argument('--online-rollback-threshold', type=float, default=0.1,
+                        help="roll back when recent log-loss exceeds the startup model's by this fraction")
+    args = parser.parse_args()
+
+    profiler = Profiler(args.profile, args.profile_output)
+    profiler.start()
+    max_request_bytes = int(args.max_request_mb * 1024 * 1024)
+    trusted_proxies = frozenset(args.trusted_proxy)
+
+    if args.candidate:
+        shadow = load_candidate(args.candidate, args.shadow_fraction)
+
+    if args.batch_jobs:
+        jobs = JobManager(load_encoder('model_artifacts.json'), predict_proba_batch,
+                          args.jobs_dir, args.job_workers, args.job_chunk_size,
+                          args.jobs_data_dir, int(args.job_max_upload_mb * 1024 * 1024),
+                          args.job_ttl_minutes * 60)
+        print "Batch jobs enabled ({} workers, results in {}/)".format(
+            args.job_workers, args.jobs_dir)
+
+    if args.registry:
+        store = ModelStore(ModelRegistry(args.registry),
+                           int(args.registry_memory_mb * 1024 * 1024))
+        print "Routing {} segments from {}/ ({:g} MB model budget)".format(
+            len(store.registry.segments), args.registry, args.registry_memory_mb)
+
+    if args.online_learning:
+        learner = OnlineLearner(coefficients, intercept, install_model, args.online_learning_rate,
+                                args.online_max_step, args.online_swap_seconds,
+                                args.online_rollback_threshold)
+        print "Online learning from /feedback, swapping every {:g}s".format(
+            args.online_swap_seconds)
+
+    if args.score_store:
+        scores = ScoreStore(args.score_store)
+        print "Serving {} precomputed scores from {}".format(scores.count(), args.score_store)
+
+    if args.coalesce:
+        coalescer = RequestCoalescer(predict_proba_batch, args.coalesce_max_batch,
+                                     args.coalesce_window_us)
+        print "Coalescing up to {} requests per {}us window".format(
+            args.coalesce_max_batch, args.coalesce_window_us)
+
+    if args.max_concurrent:
+        admission = AdmissionController(args.max_concurrent, args.max_queue, args.rate_limit,
+                                        args.rate_burst, args.default_deadline_ms)
+        print "Admission control: {} concurrent, {} queued".format(
+            args.max_concurrent, args.max_queue)
+
+    # Job uploads stream to disk inside their request, so with --batch-jobs
+    # each request needs its own thread or /predict would wait behind them
+    if args.coalesce or args.max_concurrent or args.batch_jobs:
+        server_class = ThreadedHTTPServer
+    else:
+        server_class = BaseHTTPServer.HTTPServer
+
+    try:
+        run(server_class=server_class, port=args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        profiler.stop()
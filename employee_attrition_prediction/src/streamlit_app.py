@@ -5,11 +5,16 @@ Showcases: EDA, Feature Engineering, Model Building, Validation, CI/CD
 
 import streamlit as st
 import pandas as pd
-import json
 import plotly.express as px
 import plotly.graph_objects as go
+import os
+import time
 from datetime import datetime
 
+from artifacts import load_model_artifacts as read_model_artifacts
+from cohort_index import CohortIndex
+from eda_stats import StreamingEDA
+
 # Page configuration
 st.set_page_config(
     page_title="Employee Attrition Dashboard",
@@ -24,28 +29,86 @@ page = st.sidebar.radio(
     ["Overview", "EDA", "Feature Engineering", "Model Building", "Validation", "CI/CD Status"]
 )
 
+DATA_PATH = '../data/synthetic_attrition_data.csv'
+
+def data_version():
+    # Cache key for everything read from the data file, so regenerating it
+    # rebuilds the cached data and cohort index instead of serving stale ones
+    try:
+        return os.path.getmtime(DATA_PATH)
+    except OSError:
+        return None
+
 # Load data
 @st.cache_data
-def load_data():
+def load_data(version):
     try:
-        df = pd.read_csv('../data/synthetic_attrition_data.csv')
+        df = pd.read_csv(DATA_PATH)
         return df
     except:
         st.error("Data file not found. Please run generate_data.py first.")
         return None
 
+@st.cache_data
+def load_preview(version, rows=5):
+    # The encoding example needs a few rows, not the whole file
+    try:
+        return pd.read_csv(DATA_PATH, nrows=rows)
+    except:
+        st.error("Data file not found. Please run generate_data.py first.")
+        return None
+
 @st.cache_data
 def load_model_artifacts():
     try:
-        with open('../models/model_artifacts.json', 'r') as f:
-            return json.load(f)
+        return read_model_artifacts('../models/model_artifacts.json')
     except:
         st.warning("Model not trained yet. Please run train_model.py first.")
         return None
 
-df = load_data()
+@st.cache_resource
+def load_cohort_index(version):
+    # Built once per data file version; filter changes only do mask lookups
+    return CohortIndex(load_data(version))
+
+@st.cache_resource
+def load_eda_stats():
+    # Shared across reruns and sessions; each EDA view only reads new rows
+    return StreamingEDA()
+
+version = data_version()
+# Only the Overview page needs the full DataFrame (for its cohort index); the
+# EDA page streams the file and Feature Engineering reads a few rows
+df = load_data(version) if page == "Overview" else None
 model = load_model_artifacts()
 
+# Cohort filter panel (applies to the Overview page)
+COHORT_COLUMNS = [
+    ('EMPLOYEE_HIRE_COST_CENTER_NAME_SUPERCATEGORY', 'Cost Center Supercategory'),
+    ('EMPLOYEE_HIRE_COST_CENTER_NAME_CATEGORY', 'Cost Center Category'),
+    ('EMPLOYEE_HIRE_MANAGER_6_NAME', 'Manager'),
+    ('EMPLOYEE_HIRE_WORK_CITY', 'Work City'),
+    ('TA_RECRUITER_NAME', 'Recruiter'),
+]
+
+cohort_index = None
+cohort = None
+cohort_filters = {}
+if df is not None:
+    cohort_index = load_cohort_index(version)
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔎 Cohort Filters")
+    for column, label in COHORT_COLUMNS:
+        if column in cohort_index.columns:
+            selected = st.sidebar.multiselect(label, sorted(cohort_index.values(column)))
+            if selected:
+                cohort_filters[column] = selected
+    start = time.perf_counter()
+    cohort = cohort_index.select(cohort_filters)
+    cohort_size, cohort_left, cohort_rate = cohort_index.stats(cohort)
+    st.sidebar.caption(f"{cohort_size:,} employees · resolved in "
+                       f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
 # ============ OVERVIEW PAGE ============
 if page == "Overview":
     st.title("🎯 Employee Attrition Prediction System")
@@ -54,12 +117,11 @@ if page == "Overview":
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Employees", len(df) if df is not None else 0)
+        st.metric("Total Employees", cohort_size if df is not None else 0)
     
     with col2:
         if df is not None:
-            attrition_rate = (df['Attrition'].sum() / len(df)) * 100
-            st.metric("Attrition Rate", f"{attrition_rate:.1f}%")
+            st.metric("Attrition Rate", f"{cohort_rate * 100:.1f}%")
     
     with col3:
         st.metric("Total Features", 41)
@@ -99,55 +161,88 @@ if page == "Overview":
         
         with col1:
             # Attrition by Generation
-            if 'EMPLOYEE_GENERATION' in df.columns:
-                gen_attrition = df.groupby('EMPLOYEE_GENERATION')['Attrition'].mean() * 100
+            if 'EMPLOYEE_GENERATION' in cohort_index.columns:
+                gen_attrition = cohort_index.breakdown('EMPLOYEE_GENERATION', cohort)
                 fig = px.bar(
-                    x=gen_attrition.index,
-                    y=gen_attrition.values,
+                    x=gen_attrition['value'],
+                    y=gen_attrition['attrition_rate'] * 100,
                     title="Attrition Rate by Generation",
                     labels={'x': 'Generation', 'y': 'Attrition Rate (%)'},
-                    color=gen_attrition.values,
+                    color=gen_attrition['attrition_rate'] * 100,
                     color_continuous_scale='RdYlGn_r'
                 )
                 st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Attrition by Gender
-            if 'EMPLOYEE_GENDER_CODE' in df.columns:
-                gender_attrition = df.groupby('EMPLOYEE_GENDER_CODE')['Attrition'].mean() * 100
+            if 'EMPLOYEE_GENDER_CODE' in cohort_index.columns:
+                gender_attrition = cohort_index.breakdown('EMPLOYEE_GENDER_CODE', cohort)
                 fig = px.pie(
-                    values=gender_attrition.values,
-                    names=gender_attrition.index,
+                    values=gender_attrition['attrition_rate'] * 100,
+                    names=gender_attrition['value'],
                     title="Attrition Distribution by Gender"
                 )
                 st.plotly_chart(fig, use_container_width=True)
+        
+        # Drill-down by any indexed column within the selected cohort
+        st.subheader("🧭 Cohort Drill-Down")
+        drill_column = st.selectbox("Break down by", cohort_index.columns)
+        drill = cohort_index.breakdown(drill_column, cohort)
+        drill = drill.sort_values('attrition_rate', ascending=False).head(25)
+        fig = px.bar(
+            drill,
+            x='value',
+            y='attrition_rate',
+            hover_data=['employees', 'attrition'],
+            title=f"Attrition Rate by {drill_column} (top 25)",
+            labels={'value': drill_column, 'attrition_rate': 'Attrition Rate'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
 # ============ EDA PAGE ============
 elif page == "EDA":
     st.title("🔍 Exploratory Data Analysis")
     st.markdown("---")
     
-    if df is None:
-        st.error("No data available")
+    eda = load_eda_stats()
+    problem = "No data available"
+    try:
+        start = time.perf_counter()
+        new_rows = eda.refresh(DATA_PATH)
+        refresh_ms = (time.perf_counter() - start) * 1000
+    except FileNotFoundError:
+        eda = None
+    except ValueError as e:
+        # Malformed rows (pandas' ParserError and UnicodeDecodeError included);
+        # refresh() has already reset the aggregates, so the next view retries
+        problem = f"Could not read {DATA_PATH}: {e}"
+        eda = None
+    
+    if eda is None or eda.n_rows == 0:
+        st.error(problem)
     else:
+        st.caption(f"Streaming aggregates over {eda.n_rows:,} rows · {new_rows:,} new rows "
+                   f"folded in ({refresh_ms:.0f} ms)")
+        
         # Dataset Preview
         st.subheader("📋 Dataset Preview")
-        st.dataframe(df.head(10), use_container_width=True)
+        st.dataframe(eda.sample.head(10), use_container_width=True)
+        st.caption(f"Random rows from a {len(eda.sample):,}-row reservoir sample")
         
         # Basic Statistics
         st.subheader("📊 Basic Statistics")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Rows", len(df))
-            st.metric("Total Columns", len(df.columns))
+            st.metric("Total Rows", eda.n_rows)
+            st.metric("Total Columns", len(eda.columns))
         
         with col2:
-            st.metric("Attrition Cases", int(df['Attrition'].sum()))
-            st.metric("Retention Cases", int((1 - df['Attrition']).sum()))
+            st.metric("Attrition Cases", eda.positives)
+            st.metric("Retention Cases", eda.n_rows - eda.positives)
         
         with col3:
-            attrition_pct = (df['Attrition'].sum() / len(df)) * 100
+            attrition_pct = (eda.positives / eda.n_rows) * 100
             st.metric("Class Balance", f"{attrition_pct:.1f}% / {100-attrition_pct:.1f}%")
         
         st.markdown("---")
@@ -155,29 +250,31 @@ elif page == "EDA":
         # Distribution Analysis
         st.subheader("📈 Distribution Analysis")
         
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-        if 'Attrition' in numeric_cols:
-            numeric_cols.remove('Attrition')
+        numeric_cols = eda.numeric_columns
         
         if numeric_cols:
             selected_col = st.selectbox("Select Variable", numeric_cols)
             
-            fig = px.histogram(
-                df,
-                x=selected_col,
-                color='Attrition',
+            # Pre-binned counts: the chart has one bar per bin, whatever the row count
+            edges, counts = eda.histogram(selected_col)
+            centers = (edges[:-1] + edges[1:]) / 2
+            fig = go.Figure()
+            for label, label_counts in enumerate(counts):
+                fig.add_trace(go.Bar(x=centers, y=label_counts, width=edges[1] - edges[0],
+                                     name=f"Attrition={label}", opacity=0.7))
+            fig.update_layout(
                 title=f"Distribution of {selected_col} by Attrition",
                 barmode='overlay',
-                opacity=0.7
+                xaxis_title=selected_col,
+                yaxis_title='count'
             )
             st.plotly_chart(fig, use_container_width=True)
         
         # Correlation Heatmap (for numeric features)
         st.subheader("🔥 Correlation Analysis")
-        numeric_df = df.select_dtypes(include=['int64', 'float64'])
         
-        if len(numeric_df.columns) > 1:
-            corr = numeric_df.corr()
+        if len(numeric_cols) > 1:
+            corr = eda.corr()
             
             fig = px.imshow(
                 corr,
@@ -202,7 +299,8 @@ elif page == "Feature Engineering":
     4. Combine with numerical features
     """)
     
-    if df is not None:
+    preview = load_preview(version)
+    if preview is not None:
         # Show transformation example
         st.subheader("📊 Encoding Example")
         
@@ -210,7 +308,7 @@ elif page == "Feature Engineering":
         
         with col1:
             st.markdown("**Before Encoding (Raw Data)**")
-            sample_raw = df[['EMPLOYEE_GENDER_CODE', 'EMPLOYEE_GENERATION', 'DEV_DEVELOPMENT']].head(5)
+            sample_raw = preview[['EMPLOYEE_GENDER_CODE', 'EMPLOYEE_GENERATION', 'DEV_DEVELOPMENT']]
             st.dataframe(sample_raw)
         
         with col2:
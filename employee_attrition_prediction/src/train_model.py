@@ -1,6 +1,20 @@
+import argparse
+import array
 import csv
+import hashlib
+import json
 import math
+import multiprocessing
+import os
 import random
+import re
+import time
+import zlib
+
+from xml.sax.saxutils import escape
+
+from artifacts import load_model_artifacts, prune_coefficients
+from profiling import Profiler
 
 # --- Helper Functions ---
 
@@ -13,16 +27,9 @@ def load_csv(filename):
             data.append(row)
     return headers, data
 
-def one_hot_encode(headers, data):
-    """
-    Simple One-Hot Encoding for categorical variables.
-    Returns: new_headers, new_data (all numeric)
-    """
-    # Identify column types
-    n_cols = len(headers)
-    col_types = [] # 'num' or 'cat'
-    
+def guess_column_types(data, n_cols):
     # Check first few rows to guess type
+    col_types = [] # 'num' or 'cat'
     for i in range(n_cols):
         is_numeric = True
         for row in data[:10]: # Check first 10
@@ -32,76 +39,158 @@ def one_hot_encode(headers, data):
                 is_numeric = False
                 break
         col_types.append('num' if is_numeric else 'cat')
-        
-    # Build maps for categorical columns
-    cat_maps = {} # {col_idx: {value: new_col_idx}}
-    new_headers = []
-    
+    return col_types
+
+def hash_bucket(value, buckets):
+    # crc32 rather than hash() so buckets are stable across processes and platforms
+    return (zlib.crc32(value) & 0xffffffff) % buckets
+
+def fit_encoder(headers, data, min_frequency=1, encodings=None, hash_buckets=32,
+                target=None, smoothing=10.0, col_types=None):
+    """
+    Learns how to turn raw rows into numeric feature vectors.
+
+    Categorical columns are one-hot encoded by default. `encodings` maps a
+    column name to 'hash' (hashing trick into `hash_buckets` columns),
+    'frequency' (share of rows with that value) or 'target' (smoothed mean
+    of `target` per value) for high-cardinality columns such as manager or
+    recruiter names. One-hot values seen fewer than `min_frequency` times are
+    collapsed into a single __OTHER column. Fit it on the training rows only:
+    the frequency and target maps otherwise carry test-set information.
+
+    Returns a JSON-serialisable encoder spec for transform_row().
+    """
+    encodings = encodings or {}
+    n_cols = len(headers)
+    if col_types is None:
+        col_types = guess_column_types(data, n_cols)
+    prior = sum(target) / len(target) if target else 0.0
+
+    columns = []
+    features = []
     for i in range(n_cols):
-        if col_types[i] == 'num':
-            new_headers.append(headers[i])
-        else:
-            # Find unique values
-            unique_vals = set([row[i] for row in data])
-            # Create a column for each unique value (simple OHE)
-            # To keep it manageable, maybe limit? But let's try full.
-            for val in unique_vals:
-                new_headers.append("{}_{}".format(headers[i], val))
-                
-    print "Expanded features from {} to {}...".format(n_cols, len(new_headers))
-    
-    new_data = []
-    for row in data:
-        new_row = []
-        for i in range(n_cols):
-            if col_types[i] == 'num':
-                new_row.append(float(row[i]))
+        name = headers[i]
+        kind = 'num' if col_types[i] == 'num' else encodings.get(name, 'onehot')
+        col = {'name': name, 'kind': kind}
+
+        if kind == 'num':
+            features.append(name)
+        elif kind == 'hash':
+            col['buckets'] = hash_buckets
+            features.extend("{}__hash_{}".format(name, b) for b in range(hash_buckets))
+        elif kind in ('frequency', 'target'):
+            counts = {}
+            sums = {}
+            for j, row in enumerate(data):
+                counts[row[i]] = counts.get(row[i], 0) + 1
+                if kind == 'target':
+                    sums[row[i]] = sums.get(row[i], 0.0) + target[j]
+            if kind == 'frequency':
+                col['map'] = dict((v, float(c) / len(data)) for v, c in counts.items())
+                col['default'] = 0.0
             else:
-                # OHE
-                unique_vals = set([r[i] for r in data]) # Re-calculating is inefficient but safe for this scale
-                # Wait, we need consistent mapping.
-                # Let's do it properly.
-                pass
-        # This loop is getting messy. Let's restart the logic below.
-        pass
-
-    # --- Better OHE Logic ---
-    # 1. Collect all unique values for cat columns
-    cat_values = {} # {col_idx: [val1, val2...]}
-    for i in range(n_cols):
-        if col_types[i] == 'cat':
-            unique = sorted(list(set([row[i] for row in data])))
-            cat_values[i] = unique
-            
-    # 2. Create new headers
-    final_headers = []
-    for i in range(n_cols):
-        if col_types[i] == 'num':
-            final_headers.append(headers[i])
+                # m-estimate smoothing keeps rare values close to the prior
+                col['map'] = dict((v, (sums[v] + smoothing * prior) / (c + smoothing))
+                                  for v, c in counts.items())
+                col['default'] = prior
+            features.append("{}__{}".format(name, kind))
         else:
-            for val in cat_values[i]:
-                final_headers.append("{}_{}".format(headers[i], val))
-                
-    # 3. Transform data
-    final_data = []
-    for row in data:
-        new_row = []
-        for i in range(n_cols):
-            if col_types[i] == 'num':
-                new_row.append(float(row[i]))
-            else:
-                # Add 1 for match, 0 for others
-                for val in cat_values[i]:
-                    new_row.append(1.0 if row[i] == val else 0.0)
-        final_data.append(new_row)
-        
-    return final_headers, final_data
+            counts = {}
+            for row in data:
+                counts[row[i]] = counts.get(row[i], 0) + 1
+            col['values'] = sorted(v for v, c in counts.items() if c >= min_frequency)
+            col['other'] = len(col['values']) < len(counts)
+            features.extend("{}_{}".format(name, val) for val in col['values'])
+            if col['other']:
+                features.append("{}__OTHER".format(name))
+        columns.append(col)
+
+    print "Expanded features from {} to {}...".format(n_cols, len(features))
+    return {'columns': columns, 'features': features}
+
+def transform_row(encoder, row):
+    new_row = []
+    for i, col in enumerate(encoder['columns']):
+        kind = col['kind']
+        val = row[i]
+        if kind == 'num':
+            new_row.append(float(val))
+        elif kind == 'onehot':
+            # Add 1 for match, 0 for others
+            matched = False
+            for v in col['values']:
+                hit = val == v
+                matched = matched or hit
+                new_row.append(1.0 if hit else 0.0)
+            if col['other']:
+                new_row.append(0.0 if matched else 1.0)
+        elif kind == 'hash':
+            buckets = [0.0] * col['buckets']
+            buckets[hash_bucket(val, col['buckets'])] = 1.0
+            new_row.extend(buckets)
+        else:
+            new_row.append(col['map'].get(val, col['default']))
+    return new_row
+
+def one_hot_encode(headers, data, **options):
+    """
+    Simple One-Hot Encoding for categorical variables.
+    Options are passed to fit_encoder() for high-cardinality columns.
+    Returns: new_headers, new_data (all numeric)
+    """
+    encoder = fit_encoder(headers, data, **options)
+    return encoder['features'], [transform_row(encoder, row) for row in data]
 
 def train_test_split(data, test_size=0.2):
     random.shuffle(data)
     split_idx = int(len(data) * (1 - test_size))
     return data[:split_idx], data[split_idx:]
 
+def split_indices(labels, test_size=0.2, seed=42, groups=None):
+    """
+    Seeded, stratified train/test split that returns row indices instead of
+    copying rows.
+
+    Without `groups`, each class of `labels` is shuffled and split on its
+    own, so the test set keeps the overall attrition rate. With `groups`
+    (e.g. the manager of each row), whole groups go to one side so no group
+    leaks across the split; groups are ordered by their attrition rate and
+    one group per stride goes to test, which keeps the balance approximately.
+
+    Returns: train_indices, test_indices (shuffled array('l') of row numbers)
+    """
+    rng = random.Random(seed)
+    train_idx = array.array('l')
+    test_idx = array.array('l')
+
+    if groups is None:
+        by_class = {}
+        for i, label in enumerate(labels):
+            by_class.setdefault(label, array.array('l')).append(i)
+        for label in sorted(by_class):
+            members = by_class[label]
+            rng.shuffle(members)
+            n_test = int(round(len(members) * test_size))
+            test_idx.extend(members[:n_test])
+            train_idx.extend(members[n_test:])
+    else:
+        members = {}
+        for i, group in enumerate(groups):
+            members.setdefault(group, array.array('l')).append(i)
+        names = sorted(members)
+        rng.shuffle(names)
+        names.sort(key=lambda g: sum(labels[i] for i in members[g]) / float(len(members[g])))
+        stride = max(2, int(round(1.0 / test_size)))
+        for start in range(0, len(names), stride):
+            chunk = names[start:start + stride]
+            picked = rng.randrange(len(chunk))
+            for j, group in enumerate(chunk):
+                (test_idx if j == picked else train_idx).extend(members[group])
+
+    rng.shuffle(train_idx)
+    rng.shuffle(test_idx)
+    return train_idx, test_idx
+
 def sigmoid(z):
     try:
         return 1.0 / (1.0 + math.exp(-z))
@@ -109,45 +198,182 @@ def sigmoid(z):
         return 0.0 if z < 0 else 1.0
 
 def predict_proba(row, coefficients, intercept):
+    # Only the first len(coefficients) values are used, so a training row
+    # with its target still appended can be scored without slicing it
     z = intercept
-    for i in range(len(row)):
+    for i in range(len(coefficients)):
         z += coefficients[i] * row[i]
     return sigmoid(z)
 
-def train_logistic_regression(train_data, learning_rate=0.01, epochs=50):
+def save_checkpoint(path, state):
+    # Write-then-rename so a crash mid-write never leaves a truncated checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+
+def load_checkpoint(path):
+    with open(path, 'r') as f:
+        state = json.load(f)
+    # JSON turns the RNG state tuples into lists
+    version, internal, gauss_next = state['rng_state']
+    state['rng_state'] = (version, tuple(internal), gauss_next)
+    return state
+
+def sgd_update(coefficients, intercept, features, target, learning_rate, weight=1.0, l1=0.0,
+               l2=0.0, max_step=None):
+    """
+    One logistic SGD step on a single row, updating `coefficients` in place.
+    `features` may carry the target as an extra last value; only the first
+    len(coefficients) are used. `max_step` bounds the intercept step and
+    the change of every coefficient (step * x_i).
+    Returns the new intercept and the prediction error before the update.
+    """
+    n_features = len(coefficients)
+    y_pred = predict_proba(features, coefficients, intercept)
+    error = target - y_pred
+    
+    step = weight * learning_rate * error * y_pred * (1.0 - y_pred)
+    if max_step is not None:
+        step = max(-max_step, min(max_step, step))
+    intercept += step
+    if max_step is not None:
+        # Bounding the step alone is not enough: with unscaled features (ages,
+        # tenures) step * x_i can be many times max_step. The loops below
+        # apply these bounded changes as they are.
+        features = [max(-max_step, min(max_step, step * features[i])) for i in range(n_features)]
+        step = 1.0
+    if l1 or l2:
+        decay = 1.0 - learning_rate * l2
+        shrink = learning_rate * l1
+        for i in range(n_features):
+            w = (coefficients[i] + step * features[i]) * decay
+            if w > shrink:
+                coefficients[i] = w - shrink
+            elif w < -shrink:
+                coefficients[i] = w + shrink
+            else:
+                coefficients[i] = 0.0
+    else:
+        for i in range(n_features):
+            coefficients[i] += step * features[i]
+    return intercept, error
+
+def train_logistic_regression(train_data, learning_rate=0.01, epochs=50, checkpoint_path=None,
+                              checkpoint_every=None, checkpoint_minutes=None, resume=False,
+                              indices=None, negative_rate=None, l1=0.0, l2=0.0):
+    """
+    Fits coefficients with per-row SGD over `train_data`, or only over the
+    rows listed in `indices` (see split_indices) when given.
+
+    With `negative_rate` in (0, 1), each epoch visits only that fraction of
+    the majority-class rows (a fresh random sample every epoch, drawn once
+    up front rather than row by row) and scales their updates by the
+    inverse sampling fraction, so probabilities stay calibrated while the
+    skipped majority rows cost nothing.
+
+    With `checkpoint_path` set, the coefficients, intercept, learning rate,
+    completed epoch count, RNG state and the sampling and regularization
+    options are written atomically every `checkpoint_every` epochs and/or
+    `checkpoint_minutes` minutes. With `resume`, training continues from
+    that checkpoint if it exists; a checkpoint written with other options
+    raises ValueError instead of mixing two objectives.
+
+    `l1` and `l2` add elastic-net regularization as a proximal step after
+    each update: weights decay by learning_rate * l2 and are then
+    soft-thresholded by learning_rate * l1, which sets irrelevant
+    coefficients to exactly zero (see prune_coefficients).
+    """
     n_features = len(train_data[0]) - 1
     coefficients = [0.0] * n_features
     intercept = 0.0
-    
-    for epoch in range(epochs):
+    start_epoch = 0
+    if indices is None:
+        indices = xrange(len(train_data))
+
+    if negative_rate is not None and not 0.0 < negative_rate <= 1.0:
+        raise ValueError("negative_rate must be in (0, 1], got {}".format(negative_rate))
+    majority = None
+    if negative_rate is not None and negative_rate < 1.0:
+        positives = sum(1 for idx in indices if train_data[idx][-1] == 1)
+        majority = 0 if positives * 2 <= len(indices) else 1
+        # Positions in `indices`, so a sampled epoch keeps the split's row order
+        minority_pos = array.array('l')
+        majority_pos = array.array('l')
+        for pos, idx in enumerate(indices):
+            (majority_pos if train_data[idx][-1] == majority else minority_pos).append(pos)
+        n_sampled = max(1, int(round(len(majority_pos) * negative_rate)))
+        majority_weight = len(majority_pos) / float(n_sampled)
+
+    options = {'negative_rate': negative_rate, 'l1': l1, 'l2': l2}
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path)
+        if state['n_rows'] != len(indices) or len(state['coefficients']) != n_features:
+            raise ValueError("Checkpoint {} was written for different training data".format(
+                checkpoint_path))
+        if state.get('options') != options:
+            raise ValueError("Checkpoint {} was written with {}, not {}".format(
+                checkpoint_path, state.get('options'), options))
+        coefficients = state['coefficients']
+        intercept = state['intercept']
+        learning_rate = state['learning_rate']
+        start_epoch = state['epoch']
+        random.setstate(state['rng_state'])
+        print "Resuming from {} at epoch {}".format(checkpoint_path, start_epoch)
+
+    last_checkpoint = time.time()
+    for epoch in range(start_epoch, epochs):
         sum_error = 0
-        for row in train_data:
-            features = row[:-1]
-            target = row[-1]
-            
-            y_pred = predict_proba(features, coefficients, intercept)
-            error = target - y_pred
-            sum_error += error**2
+        epoch_indices = indices
+        if majority is not None:
+            # Both position lists are sorted runs, so sorting them together is a merge
+            sampled = sorted(random.sample(majority_pos, n_sampled))
+            epoch_indices = [indices[pos] for pos in sorted(minority_pos.tolist() + sampled)]
+        for idx in epoch_indices:
+            features = train_data[idx]
+            target = features[-1]
+            weight = majority_weight if target == majority else 1.0
             
-            intercept += learning_rate * error * y_pred * (1.0 - y_pred)
-            for i in range(n_features):
-                coefficients[i] += learning_rate * error * y_pred * (1.0 - y_pred) * features[i]
+            intercept, error = sgd_update(coefficients, intercept, features, target,
+                                          learning_rate, weight, l1, l2)
+            sum_error += weight * error**2
         
         # print "Epoch %d, Error: %.3f" % (epoch, sum_error)
+
+        if checkpoint_path:
+            due = checkpoint_every and (epoch + 1) % checkpoint_every == 0
+            if checkpoint_minutes and time.time() - last_checkpoint >= checkpoint_minutes * 60:
+                due = True
+            if due:
+                save_checkpoint(checkpoint_path, {
+                    'epoch': epoch + 1,
+                    'coefficients': coefficients,
+                    'intercept': intercept,
+                    'learning_rate': learning_rate,
+                    'sum_error': sum_error,
+                    'n_rows': len(indices),
+                    'options': options,
+                    'rng_state': random.getstate()
+                })
+                last_checkpoint = time.time()
     
     return coefficients, intercept
 
-def evaluate(model, test_data):
+def evaluate(model, test_data, indices=None):
     coefficients, intercept = model
+    if indices is None:
+        indices = xrange(len(test_data))
     tp, tn, fp, fn = 0, 0, 0, 0
     
     y_true = []
     y_pred = []
     
-    for row in test_data:
-        features = row[:-1]
+    for idx in indices:
+        row = test_data[idx]
         target = row[-1]
-        prob = predict_proba(features, coefficients, intercept)
+        prob = predict_proba(row, coefficients, intercept)
         prediction = 1 if prob >= 0.5 else 0
         
         y_true.append(target)
@@ -158,7 +384,7 @@ def evaluate(model, test_data):
         elif target == 0 and prediction == 1: fp += 1
         elif target == 1 and prediction == 0: fn += 1
         
-    accuracy = float(tp + tn) / len(test_data)
+    accuracy = float(tp + tn) / len(indices)
     precision = float(tp) / (tp + fp) if (tp + fp) > 0 else 0.0
     recall = float(tp) / (tp + fn) if (tp + fn) > 0 else 0.0
     f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
@@ -171,7 +397,41 @@ def evaluate(model, test_data):
         'cm': [[tn, fp], [fn, tp]]
     }
 
-def save_svg_bar_chart(features, coefficients, filename):
+def log_loss(model, data, indices=None):
+    coefficients, intercept = model
+    if indices is None:
+        indices = xrange(len(data))
+    total = 0.0
+    for idx in indices:
+        row = data[idx]
+        p = min(max(predict_proba(row, coefficients, intercept), 1e-15), 1 - 1e-15)
+        total -= row[-1] * math.log(p) + (1 - row[-1]) * math.log(1 - p)
+    return total / len(indices)
+
+def roc_auc(model, data, indices=None):
+    """Area under the ROC curve via the rank-sum (Mann-Whitney) statistic."""
+    coefficients, intercept = model
+    if indices is None:
+        indices = xrange(len(data))
+    scored = sorted((predict_proba(data[idx], coefficients, intercept), data[idx][-1])
+                    for idx in indices)
+    n_pos = sum(1 for _, target in scored if target == 1)
+    n_neg = len(scored) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return 0.5
+    rank_sum = 0.0
+    i = 0
+    while i < len(scored):
+        # Tied scores share the average of their ranks
+        j = i
+        while j < len(scored) and scored[j][0] == scored[i][0]:
+            j += 1
+        avg_rank = (i + 1 + j) / 2.0
+        rank_sum += avg_rank * sum(1 for k in range(i, j) if scored[k][1] == 1)
+        i = j
+    return (rank_sum - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
+
+def svg_bar_chart(features, coefficients, title="Top Feature Determinants"):
     # Sort by absolute value
     combined = sorted(zip(features, coefficients), key=lambda x: abs(x[1]), reverse=True)[:15]
     features = [x[0] for x in combined]
@@ -189,7 +449,8 @@ def save_svg_bar_chart(features, coefficients, filename):
     
     svg = ['<svg width="{}" height="{}" xmlns="http://www.w3.org/2000/svg">'.format(width, height)]
     svg.append('<rect width="100%" height="100%" fill="white"/>')
-    svg.append('<text x="{}" y="30" font-family="Arial" font-size="20" text-anchor="middle">Top Feature Determinants</text>'.format(width/2))
+    # Titles and feature names can carry free-text category values
+    svg.append('<text x="{}" y="30" font-family="Arial" font-size="20" text-anchor="middle">{}</text>'.format(width/2, escape(title)))
     
     y = 60
     for i, (feat, coef) in enumerate(zip(features, coefficients)):
@@ -197,7 +458,7 @@ def save_svg_bar_chart(features, coefficients, filename):
         color = "blue" if coef > 0 else "red"
         
         # Truncate long names
-        display_feat = (feat[:45] + '..') if len(feat) > 45 else feat
+        display_feat = escape((feat[:45] + '..') if len(feat) > 45 else feat)
         
         svg.append('<text x="{}" y="{}" font-family="Arial" font-size="12" text-anchor="end">{}</text>'.format(margin_left - 10, y + 15, display_feat))
         svg.append('<rect x="{}" y="{}" width="{}" height="{}" fill="{}"/>'.format(margin_left, y, bar_width, bar_height, color))
@@ -206,12 +467,14 @@ def save_svg_bar_chart(features, coefficients, filename):
         y += bar_height + gap
         
     svg.append('</svg>')
-    
+    return '\n'.join(svg)
+
+def save_svg_bar_chart(features, coefficients, filename):
     with open(filename, 'w') as f:
-        f.write('\n'.join(svg))
+        f.write(svg_bar_chart(features, coefficients))
     print "Saved {}".format(filename)
 
-def save_svg_confusion_matrix(cm, filename):
+def svg_confusion_matrix(cm, title="Confusion Matrix"):
     tn, fp = cm[0]
     fn, tp = cm[1]
     
@@ -220,7 +483,7 @@ def save_svg_confusion_matrix(cm, filename):
     
     svg = ['<svg width="{}" height="{}" xmlns="http://www.w3.org/2000/svg">'.format(width, height)]
     svg.append('<rect width="100%" height="100%" fill="white"/>')
-    svg.append('<text x="{}" y="40" font-family="Arial" font-size="20" text-anchor="middle">Confusion Matrix</text>'.format(width/2))
+    svg.append('<text x="{}" y="40" font-family="Arial" font-size="20" text-anchor="middle">{}</text>'.format(width/2, escape(title)))
     
     # Grid
     start_x, start_y = 100, 100
@@ -251,18 +514,150 @@ def save_svg_confusion_matrix(cm, filename):
     svg.append('<text x="{}" y="{}" font-family="Arial" font-size="20" fill="white" text-anchor="middle">{}</text>'.format(start_x + cell_size*1.5, start_y + cell_size*1.5, tp))
     
     svg.append('</svg>')
-    
+    return '\n'.join(svg)
+
+def save_svg_confusion_matrix(cm, filename):
     with open(filename, 'w') as f:
-        f.write('\n'.join(svg))
+        f.write(svg_confusion_matrix(cm))
     print "Saved {}".format(filename)
 
+def build_artifacts(coefficients, intercept, features, encoder, pruned=False):
+    artifacts = {
+        'coefficients': coefficients,
+        'intercept': intercept,
+        'features': features,
+        'encoder': encoder
+    }
+    if pruned:
+        # Sparse layout: only the non-zero weights and their feature positions
+        active, weights = prune_coefficients(coefficients)
+        del artifacts['coefficients']
+        artifacts['active'] = active
+        artifacts['weights'] = weights
+    return artifacts
+
+# --- Segmented Training ---
+
+# Encoded rows for segment workers; set before forking so the workers read
+# the parent's copy instead of each receiving a pickled one
+_segment_data = None
+
+def safe_name(value):
+    """
+    File name for a free-text value (segment, cohort, manager). Values that
+    need characters replaced get a hash of the original appended, so "A/B"
+    and "A B" do not both become "A_B".
+    """
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', value)
+    if name != value or name in ('', '.', '..'):
+        name = '{}-{}'.format(name, hashlib.sha1(value).hexdigest()[:8])
+    return name
+
+def group_indices(indices, keys):
+    """{key: array of the row indices in `indices` with that key}."""
+    groups = {}
+    for idx in indices:
+        key = keys[idx]
+        if key not in groups:
+            groups[key] = array.array('l')
+        groups[key].append(idx)
+    return groups
+
+def _train_segment(task):
+    value, train_idx, test_idx, options, seed = task
+    random.seed(seed)
+    model = train_logistic_regression(_segment_data, indices=train_idx, **options)
+    metrics = evaluate(model, _segment_data, test_idx) if len(test_idx) else None
+    return value, model, metrics
+
+def train_segments(data, segments, options=None, seed=42, workers=1):
+    """
+    Trains one model per segment over the shared encoded `data`.
+    `segments` maps each value to (train indices, test indices); `options`
+    are passed to train_logistic_regression. Each segment is seeded from
+    `seed` and its value, so results do not depend on `workers`.
+    Returns [(value, (coefficients, intercept), test metrics or None)].
+    """
+    global _segment_data
+    tasks = [(value, train_idx, test_idx, options or {},
+              seed ^ (zlib.crc32(value) & 0xffffffff))
+             for value, (train_idx, test_idx) in sorted(segments.items())]
+    _segment_data = data
+    try:
+        if workers <= 1:
+            return map(_train_segment, tasks)
+        pool = multiprocessing.Pool(workers)
+        try:
+            return pool.map(_train_segment, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _segment_data = None
+
 # --- Main ---
 
+def negative_rate_arg(value):
+    rate = float(value)
+    if not 0.0 < rate <= 1.0:
+        raise argparse.ArgumentTypeError("must be in (0, 1], got {}".format(value))
+    return rate
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the attrition logistic regression model")
+    parser.add_argument('--min-frequency', type=int, default=1,
+                        help="collapse categories seen fewer times into COLUMN__OTHER")
+    parser.add_argument('--hash-columns', nargs='*', default=[],
+                        help="categorical columns encoded with the hashing trick")
+    parser.add_argument('--hash-buckets', type=int, default=32)
+    parser.add_argument('--frequency-columns', nargs='*', default=[],
+                        help="categorical columns replaced by their value frequency")
+    parser.add_argument('--target-columns', nargs='*', default=[],
+                        help="categorical columns replaced by the smoothed attrition rate")
+    parser.add_argument('--seed', type=int, default=42, help="seed for the split and training")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--group-by',
+                        help="keep all rows of this column's values on one side of the split")
+    parser.add_argument('--negative-rate', type=negative_rate_arg,
+                        help="fraction of majority-class rows sampled per epoch (importance weighted)")
+    parser.add_argument('--l1', type=float, default=0.0,
+                        help="L1 strength; zeroed coefficients are pruned from the artifact")
+    parser.add_argument('--l2', type=float, default=0.0, help="L2 strength (elastic net with --l1)")
+    parser.add_argument('--segment-by',
+                        help="train one model per value of this column instead of one overall")
+    parser.add_argument('--segment-dir', default='segments',
+                        help="directory for index.json and the per-segment artifacts (under models/)")
+    parser.add_argument('--segment-workers', type=int, default=multiprocessing.cpu_count(),
+                        help="processes training segments in parallel")
+    parser.add_argument('--min-segment-rows', type=int, default=20,
+                        help="skip segments with fewer training rows")
+    parser.add_argument('--register',
+                        help="also register each segment model in this model registry directory")
+    parser.add_argument('--checkpoint', help="checkpoint file written during training")
+    parser.add_argument('--checkpoint-every', type=int, help="checkpoint every N epochs")
+    parser.add_argument('--checkpoint-minutes', type=float, help="checkpoint every M minutes")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from --checkpoint if it exists")
+    parser.add_argument('--profile', action='store_true',
+                        help="write per-stage timings, cProfile stats and sampled stacks")
+    parser.add_argument('--profile-output', default='train_profile',
+                        help="file prefix for --profile output")
+    args = parser.parse_args()
+    profiler = Profiler(args.profile, args.profile_output)
+    profiler.start()
+
+    encodings = {}
+    for kind, names in [('hash', args.hash_columns), ('frequency', args.frequency_columns),
+                        ('target', args.target_columns)]:
+        for name in names:
+            encodings[name] = kind
+
+    random.seed(args.seed)
+
     print "Loading data..."
-    headers, raw_data = load_csv("synthetic_attrition_data.csv")
+    with profiler.stage('load_csv'):
+        headers, raw_data = load_csv("synthetic_attrition_data.csv")
     
-    print "Preprocessing (One-Hot Encoding)..."
     # Separate target (Attrition) before encoding to keep it simple
     target_idx = len(headers) - 1
     features_headers = headers[:-1]
@@ -271,42 +666,136 @@ if __name__ == "__main__":
     X_raw = [row[:-1] for row in raw_data]
     y = [float(row[-1]) for row in raw_data]
     
-    # Encode features
-    encoded_headers, X_encoded = one_hot_encode(features_headers, X_raw)
-    
-    # Recombine for splitting
-    data = []
-    for i in range(len(X_encoded)):
-        row = X_encoded[i] + [y[i]]
-        data.append(row)
-        
+    # Split before encoding: the encoder must not see the test rows' labels
+    # (target encoding) or their category counts (frequency, min-frequency)
     print "Splitting data..."
-    train_data, test_data = train_test_split(data)
+    groups = None
+    if args.group_by:
+        group_col = features_headers.index(args.group_by)
+        groups = [row[group_col] for row in X_raw]
+    with profiler.stage('split'):
+        train_idx, test_idx = split_indices(y, args.test_size, args.seed, groups)
+    print "Train rows: {}, test rows: {} ({:.1%} attrition)".format(
+        len(train_idx), len(test_idx), sum(y[i] for i in test_idx) / max(len(test_idx), 1))
     
-    print "Training Logistic Regression (SGD)..."
-    coefficients, intercept = train_logistic_regression(train_data)
-    
-    print "Evaluating..."
-    metrics = evaluate((coefficients, intercept), test_data)
-    
-    print "\nModel Performance:"
-    print "Accuracy:  {:.4f}".format(metrics['accuracy'])
-    print "Precision: {:.4f}".format(metrics['precision'])
-    print "Recall:    {:.4f}".format(metrics['recall'])
-    print "F1 Score:  {:.4f}".format(metrics['f1'])
-    
-    print "\nGenerating presentation assets (SVG)..."
-    save_svg_confusion_matrix(metrics['cm'], 'confusion_matrix.svg')
-    save_svg_bar_chart(encoded_headers, coefficients, 'feature_importance.svg')
-    
-    # Save Model Artifacts for Deployment
-    import json
-    print "\nSaving model artifacts for deployment..."
-    artifacts = {
-        'coefficients': coefficients,
-        'intercept': intercept,
-        'features': encoded_headers
-    }
-    with open('model_artifacts.json', 'w') as f:
-        json.dump(artifacts, f)
-    print "Saved model_artifacts.json"
+    print "Preprocessing (One-Hot Encoding)..."
+    with profiler.stage('guess_types'):
+        col_types = guess_column_types(X_raw, len(features_headers))
+    with profiler.stage('fit_encoder'):
+        encoder = fit_encoder(features_headers, [X_raw[i] for i in train_idx],
+                              min_frequency=args.min_frequency, encodings=encodings,
+                              hash_buckets=args.hash_buckets, target=[y[i] for i in train_idx],
+                              col_types=col_types)
+    encoded_headers = encoder['features']
+    with profiler.stage('encode_rows'):
+        X_encoded = [transform_row(encoder, row) for row in X_raw]
+    
+    # Recombine in place: the target becomes the last value of each row
+    data = X_encoded
+    for i in range(len(data)):
+        data[i].append(y[i])
+    
+    if args.segment_by:
+        # One model per value of the segment column, from the rows encoded above
+        keys = [row[features_headers.index(args.segment_by)] for row in X_raw]
+        train_groups = group_indices(train_idx, keys)
+        test_groups = group_indices(test_idx, keys)
+        segments = {}
+        for value, seg_train in train_groups.items():
+            if len(seg_train) >= args.min_segment_rows:
+                segments[value] = (seg_train, test_groups.get(value, array.array('l')))
+            else:
+                print "Skipping segment {} ({} training rows)".format(value, len(seg_train))
+        # safe_name() keeps distinct values apart; this also guards its hash
+        # suffix, before any training time is spent
+        file_names = {}
+        for value in segments:
+            name = safe_name(value)
+            if name in file_names:
+                raise ValueError("segment {!r} and {!r} map to the same file name".format(
+                    value, file_names[name]))
+            file_names[name] = value
+        print "Training {} segment models by {} ({} workers)...".format(
+            len(segments), args.segment_by, args.segment_workers)
+        with profiler.stage('train_segments'):
+            results = train_segments(data, segments, {
+                'negative_rate': args.negative_rate, 'l1': args.l1, 'l2': args.l2
+            }, args.seed, args.segment_workers)
+
+        # Models go in their own directory so no segment value, "index"
+        # included, can name a file that clashes with index.json
+        model_dir = os.path.join(args.segment_dir, 'models')
+        if not os.path.isdir(model_dir):
+            os.makedirs(model_dir)
+        registry = None
+        if args.register:
+            from model_registry import ModelRegistry
+            registry = ModelRegistry(args.register)
+        index = {}
+        with profiler.stage('save_artifacts'):
+            for value, (seg_coefficients, seg_intercept), seg_metrics in results:
+                artifacts = build_artifacts(seg_coefficients, seg_intercept, encoded_headers,
+                                            encoder, args.l1 > 0)
+                artifacts['segment'] = {'column': args.segment_by, 'value': value}
+                path = os.path.join(model_dir, safe_name(value) + '.json')
+                with open(path, 'w') as f:
+                    json.dump(artifacts, f)
+                if registry is not None:
+                    registry.register(path, [value])
+                index[value] = {
+                    'artifacts': path,
+                    'train_rows': len(segments[value][0]),
+                    'test_rows': len(segments[value][1]),
+                    'accuracy': seg_metrics['accuracy'] if seg_metrics else None,
+                    'f1': seg_metrics['f1'] if seg_metrics else None
+                }
+                print "  {:<40} {:>6} rows  accuracy {}".format(
+                    value, index[value]['train_rows'],
+                    '{:.4f}'.format(seg_metrics['accuracy']) if seg_metrics else 'n/a')
+            with open(os.path.join(args.segment_dir, 'index.json'), 'w') as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+        print "Saved {} segment models to {}/".format(len(index), args.segment_dir)
+        if registry is not None:
+            print "Registered them in {}".format(args.register)
+    else:
+        print "Training Logistic Regression (SGD)..."
+        with profiler.stage('train'):
+            coefficients, intercept = train_logistic_regression(
+                data, checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                checkpoint_minutes=args.checkpoint_minutes, resume=args.resume,
+                indices=train_idx, negative_rate=args.negative_rate, l1=args.l1, l2=args.l2)
+    
+        print "Evaluating..."
+        with profiler.stage('evaluate'):
+            metrics = evaluate((coefficients, intercept), data, test_idx)
+    
+        print "\nModel Performance:"
+        print "Accuracy:  {:.4f}".format(metrics['accuracy'])
+        print "Precision: {:.4f}".format(metrics['precision'])
+        print "Recall:    {:.4f}".format(metrics['recall'])
+        print "F1 Score:  {:.4f}".format(metrics['f1'])
+    
+        print "\nGenerating presentation assets (SVG)..."
+        with profiler.stage('svg'):
+            save_svg_confusion_matrix(metrics['cm'], 'confusion_matrix.svg')
+            save_svg_bar_chart(encoded_headers, coefficients, 'feature_importance.svg')
+    
+        # Save Model Artifacts for Deployment
+        print "\nSaving model artifacts for deployment..."
+        artifacts = build_artifacts(coefficients, intercept, encoded_headers, encoder, args.l1 > 0)
+        # Lets reports rebuild the held-out rows (see cohort_reports.held_out_rows)
+        artifacts['split'] = {'seed': args.seed, 'test_size': args.test_size,
+                              'group_by': args.group_by, 'rows': len(y)}
+        if args.l1 > 0:
+            print "Pruned to {} of {} coefficients".format(len(artifacts['active']),
+                                                           len(coefficients))
+        with profiler.stage('save_artifacts'):
+            with open('model_artifacts.json', 'w') as f:
+                json.dump(artifacts, f)
+        print "Saved model_artifacts.json"
+
+        # The run finished, so a later --resume must not pick up this checkpoint
+        if args.checkpoint and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+
+    profiler.stop()
@@ -0,0 +1,123 @@
+"""
+Content negotiation for the prediction endpoints of serve_model.py.
+
+Besides JSON, /predict and /predict/batch accept and return a compact
+binary format (Content-Type: application/x-attrition-vectors):
+
+    magic 'AV' | version (1 byte) | typecode 'f' or 'd' | rows (uint32) | cols (uint32)
+
+followed by rows * cols little-endian float32/float64 values in row-major
+order. Requests carry the encoded feature vectors; responses carry one
+probability per row (cols = 1). Either direction may also be gzipped:
+request bodies with Content-Encoding: gzip, and responses when the client
+sends Accept-Encoding: gzip. Gzipped requests are inflated only up to the
+server's request size limit, so a small body cannot expand without bound.
+"""
+import array
+import gzip
+import json
+import struct
+import sys
+import zlib
+from cStringIO import StringIO
+
+BINARY_TYPE = 'application/x-attrition-vectors'
+JSON_TYPE = 'application/json'
+
+_HEADER = struct.Struct('<2sBcII')
+_MAGIC = 'AV'
+_VERSION = 1
+
+# Below this size gzip costs more CPU than the bytes it saves
+MIN_GZIP_BYTES = 1024
+
+class PayloadTooLarge(ValueError):
+    """A request body, raw or inflated, over the size limit (HTTP 413)."""
+
+def pack_vectors(rows, typecode='d'):
+    """Encodes a list of equal-width rows as a binary payload."""
+    n_cols = len(rows[0]) if rows else 0
+    values = array.array(typecode)
+    for row in rows:
+        if len(row) != n_cols:
+            raise ValueError("rows must all have {} values".format(n_cols))
+        values.extend(row)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return _HEADER.pack(_MAGIC, _VERSION, typecode, len(rows), n_cols) + values.tostring()
+
+def unpack_vectors(payload):
+    """Decodes a binary payload into a list of rows (array.array each)."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("binary payload is shorter than its header")
+    magic, version, typecode, n_rows, n_cols = _HEADER.unpack_from(payload)
+    if magic != _MAGIC or version != _VERSION or typecode not in ('f', 'd'):
+        raise ValueError("not an attrition vector payload (version {})".format(_VERSION))
+    values = array.array(typecode)
+    values.fromstring(payload[_HEADER.size:])
+    if len(values) != n_rows * n_cols:
+        raise ValueError("expected {} values, got {}".format(n_rows * n_cols, len(values)))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    # Rows stay as array slices; scoring only indexes the active features,
+    # so most values are never boxed into Python floats
+    return [values[i * n_cols:(i + 1) * n_cols] for i in range(n_rows)]
+
+def gzip_bytes(data, level=6):
+    buf = StringIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=level) as f:
+        f.write(data)
+    return buf.getvalue()
+
+def gunzip_bytes(data, max_bytes=None):
+    """Inflates a gzip body; raises PayloadTooLarge past `max_bytes`."""
+    if max_bytes is None:
+        with gzip.GzipFile(fileobj=StringIO(data), mode='rb') as f:
+            return f.read()
+    # 16 + MAX_WBITS: expect the gzip header. Asking for one byte more than
+    # allowed tells an exact fit from a body that would keep expanding.
+    inflated = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data, max_bytes + 1)
+    if len(inflated) > max_bytes:
+        raise PayloadTooLarge("request body inflates to over {} bytes".format(max_bytes))
+    return inflated
+
+def is_binary(content_type):
+    return (content_type or '').split(';')[0].strip() == BINARY_TYPE
+
+def wants_binary(accept, content_type):
+    """Binary responses when asked for, or by default for binary requests."""
+    if accept and BINARY_TYPE in accept:
+        return True
+    return is_binary(content_type) and (not accept or accept.strip() == '*/*')
+
+def accepts_gzip(accept_encoding):
+    return 'gzip' in (accept_encoding or '')
+
+def decode_rows(body, content_type, content_encoding=None, single=False, max_bytes=None):
+    """
+    Request body -> (list of feature rows, segment key or None). JSON bodies
+    use {"features": [...]} when `single` (/predict) and {"rows": [[...], ...]}
+    otherwise, with an optional "segment"; binary requests carry the segment
+    in an X-Segment header instead. Gzipped bodies may inflate to at most
+    `max_bytes`.
+    """
+    if (content_encoding or '').strip() == 'gzip':
+        body = gunzip_bytes(body, max_bytes)
+    if is_binary(content_type):
+        rows = unpack_vectors(body)
+        if single and len(rows) != 1:
+            raise ValueError("/predict takes exactly one row")
+        return rows, None
+    data = json.loads(body)
+    rows = [data.get('features', [])] if single else data.get('rows', [])
+    return rows, data.get('segment')
+
+def encode_probabilities(probs, binary, typecode='d'):
+    """Probabilities -> (content type, body) in the negotiated format."""
+    if binary:
+        return BINARY_TYPE, pack_vectors([[p] for p in probs], typecode)
+    return JSON_TYPE, json.dumps({
+        'predictions': [1 if p >= 0.5 else 0 for p in probs],
+        'probabilities': probs,
+        'status': 'success'
+    })
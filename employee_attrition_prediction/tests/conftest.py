@@ -0,0 +1,60 @@
+import json
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+# Training and serving code is Python 2, the dashboard modules are Python 3;
+# each test file skips itself under the other interpreter
+PY2 = sys.version_info[0] == 2
+
+def write_artifacts(path, coefficients, intercept=0.0, encoder=None):
+    artifacts = {
+        'coefficients': coefficients,
+        'intercept': intercept,
+        'features': ['f{}'.format(i) for i in range(len(coefficients))],
+        'encoder': encoder
+    }
+    with open(str(path), 'w') as f:
+        json.dump(artifacts, f)
+    return str(path)
+
+def http_request(port, method, path, body='', headers=None):
+    """Raw HTTP exchange; returns everything the server wrote before closing."""
+    lines = ['{} {} HTTP/1.0'.format(method, path), 'Content-Length: {}'.format(len(body))]
+    for name, value in (headers or {}).items():
+        lines.append('{}: {}'.format(name, value))
+    sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+    try:
+        sock.sendall('\r\n'.join(lines) + '\r\n\r\n' + body)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return ''.join(chunks)
+            chunks.append(chunk)
+    finally:
+        sock.close()
+
+@pytest.fixture
+def serve_model(tmpdir, monkeypatch):
+    """(serve_model module, port): imported against a three-feature model, serving."""
+    if not PY2:
+        pytest.skip("serve_model.py is Python 2")
+    write_artifacts(tmpdir.join('model_artifacts.json'), [1.0, -1.0, 0.5], 0.1)
+    monkeypatch.chdir(tmpdir)
+    sys.modules.pop('serve_model', None)
+    import serve_model as module
+    server = module.ThreadedHTTPServer(('127.0.0.1', 0), module.RequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield module, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    sys.modules.pop('serve_model', None)
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import PY2, http_request
+
+if not PY2:
+    pytest.skip("admission.py is Python 2", allow_module_level=True)
+
+from admission import AdmissionController, Rejected
+
+def headers_of(response):
+    head = response.split('\r\n\r\n', 1)[0].split('\r\n')
+    return dict((k.lower(), v.strip()) for k, v in (line.split(':', 1) for line in head[1:]))
+
+def hold_slot(controller):
+    """Occupies the only slot from another thread; returns the release event."""
+    done = threading.Event()
+    acquired = threading.Event()
+
+    def run():
+        started = controller.acquire('holder')
+        acquired.set()
+        done.wait()
+        controller.release(started)
+
+    threading.Thread(target=run).start()
+    acquired.wait()
+    return done
+
+def test_full_queue_is_rejected_with_retry_after():
+    """Test a request beyond the slot and queue gets 503 and a retry hint."""
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    done = hold_slot(controller)
+    try:
+        with pytest.raises(Rejected) as info:
+            controller.acquire('client')
+        assert info.value.status == 503 and info.value.retry_after >= 1
+    finally:
+        done.set()
+    assert controller.stats()['queue_full'] == 1
+
+def test_queued_request_expires_with_retry_after():
+    """Test a queued request past its deadline gets 504 and a retry hint."""
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    done = hold_slot(controller)
+    try:
+        with pytest.raises(Rejected) as info:
+            controller.acquire('client', time.time() + 0.05)
+        assert info.value.status == 504 and info.value.retry_after >= 1
+    finally:
+        done.set()
+    with pytest.raises(Rejected) as info:
+        controller.check_deadline(time.time() - 1)
+    assert info.value.status == 504 and info.value.retry_after >= 1
+    assert controller.stats()['expired'] == 2
+
+def test_rate_limit_per_client():
+    """Test a client over its token bucket gets 429 while others are admitted."""
+    controller = AdmissionController(max_concurrent=4, rate=1.0, burst=2)
+    for _ in range(2):
+        controller.release(controller.acquire('a'))
+    with pytest.raises(Rejected) as info:
+        controller.acquire('a')
+    assert info.value.status == 429 and info.value.retry_after == 1
+    controller.release(controller.acquire('b'))
+
+def test_deadline_from_header_or_default():
+    """Test the deadline comes from the header, else the default, else none."""
+    assert AdmissionController().deadline(None) is None
+    now = time.time()
+    assert AdmissionController(default_deadline_ms=1000).deadline(None) == pytest.approx(
+        now + 1.0, abs=0.1)
+    assert AdmissionController().deadline('50') == pytest.approx(now + 0.05, abs=0.1)
+
+def test_shed_responses_carry_retry_after_and_length(serve_model, monkeypatch):
+    """Test 503 and 504 responses have Retry-After and a matching Content-Length."""
+    module, port = serve_model
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(module, 'admission', controller)
+    body = json.dumps({'features': [1.0, 0.0, 0.0]})
+    done = hold_slot(controller)
+    try:
+        response = http_request(port, 'POST', '/predict', body)
+    finally:
+        done.set()
+    assert response.startswith('HTTP/1.0 503')
+    headers = headers_of(response)
+    assert int(headers['retry-after']) >= 1
+    assert int(headers['content-length']) == len(response.split('\r\n\r\n', 1)[1])
+
+    # Already expired on arrival: admitted, then dropped before scoring
+    response = http_request(port, 'POST', '/predict', body, {'X-Request-Deadline-Ms': '-1'})
+    assert response.startswith('HTTP/1.0 504')
+    headers = headers_of(response)
+    assert int(headers['retry-after']) >= 1
+    assert int(headers['content-length']) == len(response.split('\r\n\r\n', 1)[1])
+
+@pytest.mark.parametrize('value', ['soon', 'nan', 'inf', '1e999'])
+def test_malformed_deadline_header_is_rejected(value):
+    """Test a non-numeric or non-finite deadline header raises a 400 rejection."""
+    with pytest.raises(Rejected) as info:
+        AdmissionController().deadline(value)
+    assert info.value.status == 400
+
+def test_client_buckets_are_capped_lru():
+    """Test fresh client ids cannot grow the buckets past max_clients."""
+    controller = AdmissionController(max_concurrent=4, rate=1.0, burst=1, max_clients=3)
+    for client in ['a', 'b', 'c']:
+        controller.release(controller.acquire(client))
+    controller.release(controller.acquire('d'))
+    assert list(controller.buckets) == ['b', 'c', 'd']
+    with pytest.raises(Rejected):
+        controller.acquire('d')
+    assert list(controller.buckets)[-1] == 'd'
+
+def test_server_answers_400_for_bad_deadline(serve_model, monkeypatch):
+    """Test a malformed X-Request-Deadline-Ms gets a 400 response, not a dropped connection."""
+    module, port = serve_model
+    monkeypatch.setattr(module, 'admission', AdmissionController(max_concurrent=1))
+    response = http_request(port, 'POST', '/predict', json.dumps({'features': [1.0, 0.0, 0.0]}),
+                            {'X-Request-Deadline-Ms': 'soon'})
+    assert response.startswith('HTTP/1.0 400')
+
+def test_client_ids_are_only_trusted_from_proxies(serve_model, monkeypatch):
+    """Test X-Client-Id is ignored unless the peer is a trusted proxy."""
+    module, port = serve_model
+    monkeypatch.setattr(module, 'admission', AdmissionController(max_concurrent=4, rate=0.01,
+                                                                 burst=1))
+    body = json.dumps({'features': [1.0, 0.0, 0.0]})
+    assert http_request(port, 'POST', '/predict', body,
+                        {'X-Client-Id': 'one'}).startswith('HTTP/1.0 200')
+    assert http_request(port, 'POST', '/predict', body,
+                        {'X-Client-Id': 'two'}).startswith('HTTP/1.0 429')
+    monkeypatch.setattr(module, 'trusted_proxies', frozenset(['127.0.0.1']))
+    assert http_request(port, 'POST', '/predict', body,
+                        {'X-Client-Id': 'three'}).startswith('HTTP/1.0 200')
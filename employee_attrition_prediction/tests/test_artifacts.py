@@ -0,0 +1,18 @@
+import json
+
+from artifacts import load_model_artifacts, prune_coefficients
+
+def test_prune_coefficients_keeps_non_zero_weights():
+    """Test pruning returns the positions and values of the non-zero weights."""
+    assert prune_coefficients([0.0, 1.5, 0.0, -2.0]) == ([1, 3], [1.5, -2.0])
+
+def test_pruned_artifacts_load_dense(tmpdir):
+    """Test sparse (L1) artifacts load with the same dense coefficients as unpruned ones."""
+    coefficients = [0.0, 1.5, 0.0, -2.0]
+    active, weights = prune_coefficients(coefficients)
+    path = tmpdir.join('model_artifacts.json')
+    path.write(json.dumps({'active': active, 'weights': weights, 'intercept': 0.5,
+                           'features': ['a', 'b', 'c', 'd']}))
+    artifacts = load_model_artifacts(str(path))
+    assert artifacts['coefficients'] == coefficients
+    assert artifacts['intercept'] == 0.5
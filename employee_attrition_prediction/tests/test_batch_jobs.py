@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import PY2, SRC_DIR, http_request, write_artifacts
+
+if not PY2:
+    pytest.skip("batch_jobs.py is Python 2", allow_module_level=True)
+
+from StringIO import StringIO
+
+from batch_jobs import JobManager
+
+ENCODER = {'columns': [{'name': 'AGE', 'kind': 'num'}], 'features': ['AGE']}
+EXTRACT = 'EMPLOYEE_ID,AGE\ne1,30\ne2,40\n'
+
+def predict_batch(vectors):
+    return [v[0] / 100.0 for v in vectors]
+
+def wait_for(manager, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job is None or job.status not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job {} did not finish".format(job_id))
+
+@pytest.fixture
+def manager(tmpdir):
+    data_dir = tmpdir.mkdir('data')
+    data_dir.join('extract.csv').write(EXTRACT)
+    tmpdir.join('secret.csv').write(EXTRACT)
+    return JobManager(ENCODER, predict_batch, str(tmpdir.join('jobs')), data_dir=str(data_dir),
+                      max_upload_bytes=1024)
+
+def test_path_input_is_scored(manager):
+    """Test a path inside the data directory is scored to the output CSV."""
+    job = manager.submit(input_path='extract.csv', id_column='EMPLOYEE_ID')
+    job = wait_for(manager, job.job_id)
+    assert job.status == 'done'
+    with open(job.output_path) as f:
+        rows = list(csv.reader(f))
+    assert rows == [['row', 'EMPLOYEE_ID', 'probability', 'prediction'],
+                    ['0', 'e1', '0.3', '0'], ['1', 'e2', '0.4', '0']]
+
+@pytest.mark.parametrize('path', ['/etc/passwd', '../secret.csv', 'missing.csv', ''])
+def test_inputs_outside_data_dir_are_rejected(manager, path):
+    """Test absolute paths, traversal and missing files are refused."""
+    with pytest.raises(ValueError):
+        manager.submit(input_path=path)
+
+def test_path_inputs_need_a_data_dir(tmpdir):
+    """Test path inputs are disabled when no data directory is configured."""
+    manager = JobManager(ENCODER, predict_batch, str(tmpdir.join('jobs')))
+    with pytest.raises(ValueError):
+        manager.submit(input_path=str(tmpdir.join('anything.csv')))
+
+def test_upload_is_capped_and_streamed(manager):
+    """Test uploads over the cap are refused and smaller ones are copied from the stream."""
+    with pytest.raises(ValueError):
+        manager.submit(upload=StringIO('x' * 2000), upload_bytes=2000)
+    job = wait_for(manager, manager.submit(upload=StringIO(EXTRACT),
+                                           upload_bytes=len(EXTRACT)).job_id)
+    assert job.status == 'done' and job.rows.value == 2
+
+def test_finished_jobs_expire_with_their_files(tmpdir):
+    """Test a finished job and its uploaded input are removed after the TTL."""
+    manager = JobManager(ENCODER, predict_batch, str(tmpdir.join('jobs')), ttl_seconds=0.3)
+    job = manager.submit(upload=StringIO(EXTRACT), upload_bytes=len(EXTRACT))
+    assert wait_for(manager, job.job_id).status == 'done'
+    time.sleep(0.6)
+    assert manager.get(job.job_id) is None
+    assert not os.path.exists(job.output_path)
+    assert not os.path.exists(job.input_path)
+
+def test_server_refuses_oversized_upload(serve_model, monkeypatch, tmpdir):
+    """Test POST /jobs answers 413 without reading a body over the cap."""
+    module, port = serve_model
+    monkeypatch.setattr(module, 'jobs', JobManager(ENCODER, predict_batch, str(tmpdir.join('jobs')),
+                                                   max_upload_bytes=1024))
+    response = http_request(port, 'POST', '/jobs', 'x' * 2000, {'Content-Type': 'text/csv'})
+    assert response.startswith('HTTP/1.0 413')
+    response = http_request(port, 'POST', '/jobs', json.dumps({'input': '/etc/passwd'}))
+    assert response.startswith('HTTP/1.0 400')
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def test_upload_in_progress_does_not_block_predict(tmpdir):
+    """Test /predict answers while a --batch-jobs upload is still arriving."""
+    write_artifacts(tmpdir.join('model_artifacts.json'), [1.0], 0.0, ENCODER)
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'serve_model.py'),
+                               '--batch-jobs', '--port', str(port)],
+                              cwd=str(tmpdir), stdout=open(os.devnull, 'w'),
+                              stderr=subprocess.STDOUT)
+    upload = None
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                upload = socket.create_connection(('127.0.0.1', port), timeout=10)
+                break
+            except socket.error:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+        # Headers and half of the body; the handler is now blocked reading it
+        upload.sendall('POST /jobs HTTP/1.0\r\nContent-Type: text/csv\r\n'
+                       'Content-Length: 1000\r\n\r\nAGE\n30\n')
+        time.sleep(0.2)
+        response = http_request(port, 'POST', '/predict', json.dumps({'features': [1.0]}))
+        assert response.startswith('HTTP/1.0 200')
+    finally:
+        if upload is not None:
+            upload.close()
+        server.terminate()
+        server.wait()
@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import PY2
+
+if not PY2:
+    pytest.skip("benchmark_suite.py is Python 2", allow_module_level=True)
+
+from benchmark_suite import compare, peak_rss_mb, reset_peak_rss
+
+def result(relative_speed, peak_mb):
+    return {'relative_speed': relative_speed, 'peak_mb': peak_mb}
+
+def test_compare_flags_slowdown_and_memory_growth():
+    """Test only stages beyond the threshold fail, and new stages are ignored."""
+    baseline = {'results': {'train@10': result(100.0, 10.0), 'encode@10': result(100.0, 10.0)}}
+    report = {'results': {'train@10': result(75.0, 10.0), 'encode@10': result(95.0, 20.0),
+                          'serve@10': result(1.0, 99.0)}}
+    failures = compare(report, baseline, 0.2)
+    assert len(failures) == 2
+    assert failures[0].startswith('encode@10') and 'MB' in failures[0]
+    assert failures[1].startswith('train@10')
+
+def test_peak_reset_exposes_allocations_below_an_earlier_peak():
+    """Test a stage's allocation shows up even when building its inputs peaked higher."""
+    transient = [0.0] * 20000000  # ~150MB, like a load-then-encode input build
+    del transient
+    if not reset_peak_rss():
+        pytest.skip("peak RSS cannot be reset on this platform")
+    before = peak_rss_mb()
+    stage = [1.0] * 5000000  # ~40MB
+    assert peak_rss_mb() - before > 30
+    del stage
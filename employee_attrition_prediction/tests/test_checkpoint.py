@@ -0,0 +1,62 @@
+import os
+import random
+
+import pytest
+
+from conftest import PY2
+
+if not PY2:
+    pytest.skip("train_model.py is Python 2", allow_module_level=True)
+
+from train_model import load_checkpoint, save_checkpoint, train_logistic_regression
+
+def make_rows(n=200, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        x = [rng.random(), rng.random(), rng.random()]
+        rows.append(x + [1.0 if x[0] + rng.random() * 0.5 > 0.9 else 0.0])
+    return rows
+
+def test_save_checkpoint_is_atomic_and_round_trips(tmpdir):
+    """Test the checkpoint is renamed into place and the RNG state comes back as tuples."""
+    path = str(tmpdir.join('ckpt.json'))
+    random.seed(7)
+    save_checkpoint(path, {'epoch': 2, 'rng_state': random.getstate()})
+    assert not os.path.exists(path + '.tmp')
+    state = load_checkpoint(path)
+    assert state['epoch'] == 2
+    assert state['rng_state'] == random.getstate()
+
+def test_resume_matches_uninterrupted_training(tmpdir):
+    """Test stopping after 3 epochs and resuming gives the same model as 6 straight epochs."""
+    rows = make_rows()
+    random.seed(11)
+    expected = train_logistic_regression(rows, epochs=6, negative_rate=0.5)
+
+    path = str(tmpdir.join('ckpt.json'))
+    random.seed(11)
+    train_logistic_regression(rows, epochs=3, negative_rate=0.5, checkpoint_path=path,
+                              checkpoint_every=3)
+    random.seed(999)  # a fresh process; the checkpoint restores the RNG
+    resumed = train_logistic_regression(rows, epochs=6, negative_rate=0.5, checkpoint_path=path,
+                                        checkpoint_every=3, resume=True)
+    assert resumed == expected
+
+def test_resume_rejects_checkpoint_for_other_data(tmpdir):
+    """Test resuming on a different number of rows raises instead of mixing runs."""
+    path = str(tmpdir.join('ckpt.json'))
+    train_logistic_regression(make_rows(), epochs=1, checkpoint_path=path, checkpoint_every=1)
+    with pytest.raises(ValueError):
+        train_logistic_regression(make_rows(150), epochs=2, checkpoint_path=path, resume=True)
+
+@pytest.mark.parametrize('options', [{'negative_rate': 0.25}, {'negative_rate': 0.5, 'l1': 0.01},
+                                     {'negative_rate': 0.5, 'l2': 0.1}, {}])
+def test_resume_rejects_checkpoint_with_other_options(tmpdir, options):
+    """Test resuming with a different negative_rate, l1 or l2 raises."""
+    path = str(tmpdir.join('ckpt.json'))
+    train_logistic_regression(make_rows(), epochs=1, checkpoint_path=path, checkpoint_every=1,
+                              negative_rate=0.5)
+    with pytest.raises(ValueError):
+        train_logistic_regression(make_rows(), epochs=2, checkpoint_path=path, resume=True,
+                                  **options)
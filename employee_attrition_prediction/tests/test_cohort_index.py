@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import PY2
+
+if PY2:
+    pytest.skip("cohort_index.py is Python 3", allow_module_level=True)
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from cohort_index import CohortIndex
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 2000
+    frame = pd.DataFrame({
+        'MANAGER': rng.choice(['m{}'.format(i) for i in range(300)], n),
+        'CITY': rng.choice(['Austin', 'Boston', 'Chicago'], n),
+        'AGE': rng.integers(20, 60, n),
+        'Attrition': rng.integers(0, 2, n),
+    })
+    frame.loc[::50, 'CITY'] = None
+    return frame
+
+
+def test_select_and_stats_match_pandas(df):
+    """Test cohort counts and attrition match a boolean DataFrame filter."""
+    index = CohortIndex(df)
+    assert sorted(index.columns) == ['CITY', 'MANAGER']
+    filters = {'CITY': ['Austin', 'Chicago'], 'MANAGER': ['m1', 'm2', 'm250', 'unknown']}
+    cohort = index.select(filters)
+    expected = df[df.CITY.isin(filters['CITY']) & df.MANAGER.isin(filters['MANAGER'])]
+    count, left, rate = index.stats(cohort)
+    assert count == len(expected)
+    assert left == expected.Attrition.sum()
+    assert rate == pytest.approx(expected.Attrition.mean())
+
+
+def test_no_filters_select_every_row(df):
+    """Test empty filters, or empty value lists, select all rows."""
+    index = CohortIndex(df)
+    assert index.stats(index.select({}))[0] == len(df)
+    assert index.stats(index.select({'CITY': []}))[0] == len(df)
+
+
+def test_breakdown_matches_groupby_and_skips_missing(df):
+    """Test per-value counts match groupby, with missing values in no group."""
+    index = CohortIndex(df)
+    cohort = index.select({'MANAGER': ['m{}'.format(i) for i in range(100)]})
+    breakdown = index.breakdown('CITY', cohort).set_index('value')
+    expected = df[df.MANAGER.isin(['m{}'.format(i) for i in range(100)])].groupby('CITY')
+    assert breakdown.employees.to_dict() == expected.size().to_dict()
+    assert breakdown.attrition.to_dict() == expected.Attrition.sum().to_dict()
+
+
+def test_codes_are_compact(df):
+    """Test a column with a few hundred values costs two bytes per row."""
+    index = CohortIndex(df)
+    assert index.codes['CITY'].dtype == np.uint8
+    assert index.codes['MANAGER'].dtype == np.uint16
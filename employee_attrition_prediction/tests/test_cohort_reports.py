@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PY2, SRC_DIR, write_artifacts
+
+if not PY2:
+    pytest.skip("cohort_reports.py is Python 2", allow_module_level=True)
+
+from cohort_reports import accumulate, held_out_rows
+from train_model import safe_name, split_indices, svg_bar_chart, svg_confusion_matrix
+
+ENCODER = {'columns': [{'name': 'AGE', 'kind': 'num'}], 'features': ['AGE']}
+
+def write_extract(path, n=50, managers=('A B', 'A/B')):
+    with open(path, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(['MANAGER', 'AGE', 'Attrition'])
+        for i in range(n):
+            writer.writerow([managers[i % len(managers)], 20 + i, i % 3 == 0 and 1 or 0])
+
+def run_reports(tmpdir, data, model):
+    output = str(tmpdir.join('reports'))
+    process = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'cohort_reports.py'),
+                                '--data', data, '--artifacts', model, '--by', 'MANAGER',
+                                '--output', output, '--workers', '1'],
+                               cwd=SRC_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output_text = process.communicate()[0]
+    return process.returncode, output_text, output
+
+def test_safe_name_keeps_distinct_values_apart():
+    """Test values that differ only in replaced characters get distinct names."""
+    assert safe_name('A/B') != safe_name('A B')
+    assert safe_name('Plain_name-1.0') == 'Plain_name-1.0'
+    for value in ('..', '.', '', '../etc'):
+        name = safe_name(value)
+        assert name not in ('..', '.', '') and '/' not in name
+
+def test_svg_labels_are_escaped():
+    """Test titles and feature names with markup are escaped in the SVG."""
+    bar = svg_bar_chart(['MANAGER_<b>&co'], [0.5], 'Top: <script>')
+    matrix = svg_confusion_matrix([[1, 2], [3, 4]], 'Matrix: R&D <x>')
+    assert '<script>' not in bar and '&lt;script&gt;' in bar and '&amp;co' in bar
+    assert 'R&amp;D &lt;x&gt;' in matrix
+
+def test_confusion_matrix_counts_only_held_out_rows(tmpdir):
+    """Test the matrix covers the rebuilt test split while n covers every row."""
+    data = str(tmpdir.join('data.csv'))
+    write_extract(data)
+    split = {'seed': 7, 'test_size': 0.2, 'group_by': None, 'rows': 50}
+    mask = held_out_rows(data, split)
+    labels = [1.0 if i % 3 == 0 else 0.0 for i in range(50)]
+    expected = set(split_indices(labels, 0.2, 7)[1])
+    assert set(i for i in range(50) if mask[i]) == expected
+
+    artifacts = {'encoder': ENCODER, 'coefficients': [0.1], 'intercept': -3.0}
+    cohorts, _ = accumulate(data, artifacts, ['MANAGER'], eval_rows=mask)
+    assert sum(sum(stats[:4]) for stats in cohorts.values()) == len(expected)
+    assert sum(stats[4] for stats in cohorts.values()) == 50
+
+def test_split_is_not_rebuilt_for_other_data(tmpdir):
+    """Test a missing split or a different row count falls back to in-sample."""
+    data = str(tmpdir.join('data.csv'))
+    write_extract(data)
+    assert held_out_rows(data, None) is None
+    assert held_out_rows(data, {'seed': 7, 'test_size': 0.2, 'group_by': None,
+                                'rows': 49}) is None
+
+def test_reports_for_colliding_names_do_not_overwrite(tmpdir):
+    """Test "A/B" and "A B" get separate report directories and index entries."""
+    data = str(tmpdir.join('data.csv'))
+    write_extract(data)
+    model = str(tmpdir.join('model.json'))
+    write_artifacts(model, [0.1], -3.0, ENCODER)
+    returncode, text, output = run_reports(tmpdir, data, model)
+    assert returncode == 0, text
+    with open(os.path.join(output, 'index.json')) as f:
+        index = json.load(f)
+    assert sorted(entry['value'] for entry in index) == ['A B', 'A/B']
+    assert len(set(entry['report'] for entry in index)) == 2
+    assert all(entry['scope'] == 'in-sample' and entry['evaluated'] == 25 for entry in index)
+
+def test_reports_of_vanished_cohorts_are_removed(tmpdir):
+    """Test a rerun deletes the reports of cohorts missing from the new data."""
+    data = str(tmpdir.join('data.csv'))
+    model = write_artifacts(tmpdir.join('model.json'), [0.1], -3.0, ENCODER)
+    write_extract(data, managers=('Ana', 'Bo', 'Cy'))
+    assert run_reports(tmpdir, data, model)[0] == 0
+    reports = tmpdir.join('reports', 'MANAGER')
+    assert sorted(p.basename for p in reports.listdir()) == ['Ana', 'Bo', 'Cy']
+    reports.join('Ana', 'notes.txt').write('kept')
+    write_extract(data, managers=('Ana', 'Bo'))
+    returncode, text, _ = run_reports(tmpdir, data, model)
+    assert returncode == 0, text
+    assert sorted(p.basename for p in reports.listdir()) == ['Ana', 'Bo']
+    assert reports.join('Ana', 'notes.txt').check()
+
+def test_null_encoder_is_refused(tmpdir):
+    """Test artifacts saved with "encoder": null exit with a message, not a TypeError."""
+    data = str(tmpdir.join('data.csv'))
+    write_extract(data)
+    returncode, text, _ = run_reports(tmpdir, data, write_artifacts(tmpdir.join('m.json'), [0.1]))
+    assert returncode != 0
+    assert 'has no encoder' in text and 'TypeError' not in text
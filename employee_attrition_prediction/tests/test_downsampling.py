@@ -0,0 +1,39 @@
+import argparse
+import random
+
+import pytest
+
+from conftest import PY2
+
+if not PY2:
+    pytest.skip("train_model.py is Python 2", allow_module_level=True)
+
+import train_model
+from train_model import negative_rate_arg, train_logistic_regression
+
+ROWS = [[0.1 * (i % 7), 1.0] for i in range(100)] + [[0.2 * (i % 5), 0.0] for i in range(400)]
+
+@pytest.mark.parametrize('rate', [0.0, -0.5, 1.5])
+def test_negative_rate_outside_unit_interval_is_rejected(rate):
+    """Test rates outside (0, 1] raise instead of dividing by zero or oversampling."""
+    with pytest.raises(ValueError):
+        train_logistic_regression(ROWS, epochs=1, negative_rate=rate)
+    with pytest.raises(argparse.ArgumentTypeError):
+        negative_rate_arg(str(rate))
+
+def test_each_epoch_visits_only_the_sampled_majority_rows(monkeypatch):
+    """Test an epoch updates on every minority row and rate * majority rows, reweighted."""
+    calls = []
+    real_update = train_model.sgd_update
+
+    def counting_update(coefficients, intercept, features, target, learning_rate, weight=1.0,
+                        *args):
+        calls.append((target, weight))
+        return real_update(coefficients, intercept, features, target, learning_rate, weight,
+                           *args)
+
+    monkeypatch.setattr(train_model, 'sgd_update', counting_update)
+    random.seed(0)
+    train_logistic_regression(ROWS, epochs=3, negative_rate=0.25)
+    assert len(calls) == 3 * (100 + 100)
+    assert set(calls) == set([(1.0, 1.0), (0.0, 4.0)])
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from conftest import PY2
+
+if PY2:
+    pytest.skip("eda_stats.py is Python 3", allow_module_level=True)
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from eda_stats import StreamingEDA
+
+
+def frame(n, seed=0, shift=0.0):
+    rng = np.random.default_rng(seed)
+    age = rng.normal(35 + shift, 8, n).round()
+    return pd.DataFrame({
+        'CITY': rng.choice(['Austin', 'Boston'], n),
+        'AGE': age,
+        'TENURE': (age / 10 + rng.normal(0, 1, n)).round(2),
+        'Attrition': (rng.random(n) < 0.2 + (age < 30) * 0.3).astype(int),
+    })
+
+
+def assert_matches(eda, df):
+    assert eda.n_rows == len(df)
+    assert eda.positives == df.Attrition.sum()
+    expected = df[['AGE', 'TENURE', 'Attrition']]
+    np.testing.assert_allclose(eda.summary()['mean'], expected.mean())
+    np.testing.assert_allclose(eda.corr().to_numpy(), expected.corr().to_numpy(), atol=1e-9)
+
+
+def test_appended_rows_are_folded_in(tmp_path):
+    """Test an append is read incrementally and matches a full pandas pass."""
+    path = tmp_path / 'data.csv'
+    first, second = frame(500), frame(300, seed=1)
+    first.to_csv(path, index=False)
+    eda = StreamingEDA()
+    assert eda.refresh(path, chunksize=128) == 500
+    with open(path, 'a') as f:
+        second.to_csv(f, index=False, header=False)
+    assert eda.refresh(path, chunksize=128) == 300
+    assert eda.refresh(path) == 0
+    assert_matches(eda, pd.concat([first, second]))
+
+
+def test_corr_includes_the_target(tmp_path):
+    """Test the heatmap matrix has an Attrition row and column."""
+    path = tmp_path / 'data.csv'
+    frame(200).to_csv(path, index=False)
+    eda = StreamingEDA()
+    eda.refresh(path)
+    assert list(eda.corr().columns) == ['AGE', 'TENURE', 'Attrition']
+    assert 'Attrition' not in eda.numeric_columns
+
+
+def test_rewritten_larger_file_is_rebuilt(tmp_path):
+    """Test a file rewritten in place with more rows is read again from the start."""
+    path = tmp_path / 'data.csv'
+    frame(300).to_csv(path, index=False)
+    eda = StreamingEDA()
+    eda.refresh(path)
+    # Same header, different rows, and a different column order in the bytes
+    # the old offset would land in
+    rewritten = frame(1000, seed=2, shift=5.0)
+    rewritten.to_csv(path, index=False)
+    assert eda.refresh(path) == 1000
+    assert_matches(eda, rewritten)
+
+
+def test_shrunk_or_replaced_file_is_rebuilt(tmp_path):
+    """Test truncation and replacement by another file drop the old totals."""
+    path = tmp_path / 'data.csv'
+    frame(500).to_csv(path, index=False)
+    eda = StreamingEDA()
+    eda.refresh(path)
+    smaller = frame(100, seed=3)
+    smaller.to_csv(path, index=False)
+    assert eda.refresh(path) == 100
+    assert_matches(eda, smaller)
+
+    replacement = frame(100, seed=4)
+    replacement.to_csv(tmp_path / 'new.csv', index=False)
+    os.replace(tmp_path / 'new.csv', path)
+    eda.refresh(path)
+    assert_matches(eda, replacement)
+
+
+def test_parse_error_leaves_no_partial_totals(tmp_path):
+    """Test a row that fails to parse resets the aggregates instead of half-applying."""
+    path = tmp_path / 'data.csv'
+    frame(100).to_csv(path, index=False)
+    eda = StreamingEDA()
+    eda.refresh(path)
+    with open(path, 'a') as f:
+        frame(300, seed=5).to_csv(f, index=False, header=False)
+        f.write('Austin,not-a-number,1.0,oops\n')
+    with pytest.raises(ValueError):
+        eda.refresh(path, chunksize=100)
+    assert eda.n_rows == 0 and eda.columns is None
+
+
+def test_partial_rows_wait_for_the_newline(tmp_path):
+    """Test a header-only file and a half-written row are picked up later."""
+    path = tmp_path / 'data.csv'
+    path.write_text('CITY,AGE,TENURE,Attrition\n')
+    eda = StreamingEDA()
+    assert eda.refresh(path) == 0
+    with open(path, 'a') as f:
+        f.write('Austin,30,3.0,1\nBoston,4')
+    assert eda.refresh(path) == 1
+    with open(path, 'a') as f:
+        f.write('0,4.0,0\n')
+    assert eda.refresh(path) == 1
+    assert eda.n_rows == 2 and eda.summary()['mean']['AGE'] == 35
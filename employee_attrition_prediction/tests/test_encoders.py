@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PY2, SRC_DIR, write_artifacts
+
+if not PY2:
+    pytest.skip("train_model.py is Python 2", allow_module_level=True)
+
+from train_model import (fit_encoder, hash_bucket, load_model_artifacts, split_indices,
+                         transform_row)
+
+HEADERS = ['AGE', 'GENDER', 'MANAGER']
+ROWS = [['30', 'M', 'a'], ['40', 'F', 'a'], ['50', 'F', 'b'], ['60', 'F', 'c']]
+TARGET = [1.0, 1.0, 0.0, 0.0]
+
+def test_one_hot_collapses_rare_values():
+    """Test values below min_frequency share one __OTHER column."""
+    encoder = fit_encoder(HEADERS, ROWS, min_frequency=2)
+    assert encoder['features'] == ['AGE', 'GENDER_F', 'GENDER__OTHER', 'MANAGER_a',
+                                   'MANAGER__OTHER']
+    assert transform_row(encoder, ['35', 'M', 'z']) == [35.0, 0.0, 1.0, 0.0, 1.0]
+
+def test_unseen_value_without_other_column_is_all_zero():
+    """Test a value absent at fit time encodes as zeros, not an error."""
+    encoder = fit_encoder(HEADERS, ROWS)
+    assert transform_row(encoder, ['35', 'X', 'a'])[1:3] == [0.0, 0.0]
+
+def test_hash_encoding_is_stable():
+    """Test hashed columns set exactly the crc32 bucket."""
+    encoder = fit_encoder(HEADERS, ROWS, encodings={'MANAGER': 'hash'}, hash_buckets=8)
+    row = transform_row(encoder, ['35', 'M', 'some manager'])
+    buckets = row[-8:]
+    assert sum(buckets) == 1.0
+    assert buckets[hash_bucket('some manager', 8)] == 1.0
+
+def test_frequency_and_target_maps():
+    """Test frequency shares and m-estimate smoothed target means."""
+    encoder = fit_encoder(HEADERS, ROWS, encodings={'MANAGER': 'target', 'GENDER': 'frequency'},
+                          target=TARGET, smoothing=2.0)
+    gender, manager = encoder['columns'][1], encoder['columns'][2]
+    assert gender['map'] == {'M': 0.25, 'F': 0.75}
+    # prior 0.5: (2 + 2 * 0.5) / (2 + 2) for 'a', (0 + 1) / (1 + 2) for 'b'
+    assert manager['map']['a'] == pytest.approx(0.75)
+    assert manager['map']['b'] == pytest.approx(1.0 / 3)
+    assert transform_row(encoder, ['35', 'X', 'unseen']) == [35.0, 0.0, 0.5]
+
+def test_training_fits_encoder_on_training_rows_only(tmpdir):
+    """Test train_model.py leaves test-only managers out of the target encoding."""
+    from generate_data import generate_dataset
+    headers, rows = generate_dataset(300, n_managers=40)
+    with open(str(tmpdir.join('synthetic_attrition_data.csv')), 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+    column = 'EMPLOYEE_HIRE_MANAGER_6_NAME'
+    subprocess.check_call([sys.executable, os.path.join(SRC_DIR, 'train_model.py'),
+                           '--target-columns', column, '--group-by', column],
+                          cwd=str(tmpdir), stdout=open(os.devnull, 'w'))
+    with open(str(tmpdir.join('model_artifacts.json'))) as f:
+        encoder = json.load(f)['encoder']
+
+    position = headers.index(column)
+    managers = [row[position] for row in rows]
+    train_idx, test_idx = split_indices([float(row[-1]) for row in rows], 0.2, 42, managers)
+    mapped = set(encoder['columns'][position]['map'])
+    assert mapped == set(managers[i] for i in train_idx)
+    assert not mapped & set(managers[i] for i in test_idx)
+
+def test_non_ascii_categories_survive_saved_artifacts(tmpdir):
+    """Test a UTF-8 category read back from model_artifacts.json still matches CSV rows."""
+    rows = [['30', 'Zo\xc3\xab', 'Jos\xc3\xa9'], ['40', 'Zo\xc3\xab', 'Ana'],
+            ['50', 'Ana', 'Jos\xc3\xa9'], ['60', 'Ana', 'Ana']]
+    encoder = fit_encoder(HEADERS, rows, encodings={'MANAGER': 'target'}, target=TARGET)
+    expected = [transform_row(encoder, row) for row in rows]
+    path = write_artifacts(tmpdir.join('model.json'), [0.0] * len(encoder['features']),
+                           encoder=encoder)
+    loaded = load_model_artifacts(path)['encoder']
+    assert [transform_row(loaded, row) for row in rows] == expected
+    assert transform_row(loaded, rows[0])[1:3] == [0.0, 1.0]
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from conftest import PY2, http_request, write_artifacts
+
+if not PY2:
+    pytest.skip("model_registry.py is Python 2", allow_module_level=True)
+
+from model_registry import ModelRegistry, ModelStore
+
+@pytest.fixture
+def registry(tmpdir):
+    return ModelRegistry(str(tmpdir.join('registry')))
+
+def test_identical_artifacts_are_stored_once(registry, tmpdir):
+    """Test registering the same content twice yields one object and one digest."""
+    first = write_artifacts(tmpdir.join('a.json'), [1.0, 0.0, 2.0])
+    copy = write_artifacts(tmpdir.join('b.json'), [1.0, 0.0, 2.0])
+    digest = registry.register(first, ['Sales'])
+    assert registry.register(copy, ['Marketing']) == digest
+    assert os.listdir(registry.objects_dir) == [digest + '.json']
+    assert registry.resolve('Sales') == registry.resolve('Marketing') == digest
+
+def test_index_survives_a_reload(registry, tmpdir):
+    """Test segments registered by another registry instance appear after reload()."""
+    other = ModelRegistry(registry.root)
+    digest = other.register(write_artifacts(tmpdir.join('a.json'), [1.0]), ['Sales'])
+    assert registry.resolve('Sales') is None
+    registry.reload()
+    assert registry.resolve('Sales') == digest
+    with open(registry.index_path) as f:
+        assert json.load(f) == {'Sales': digest}
+
+def test_store_loads_lazily_and_evicts_lru(registry, tmpdir):
+    """Test models load on first use and the least recently used is evicted over budget."""
+    for i, segment in enumerate(['A', 'B', 'C']):
+        registry.register(write_artifacts(tmpdir.join('{}.json'.format(segment)),
+                                          [1.0, 0.0, float(i + 1)]), [segment])
+    store = ModelStore(registry, memory_budget=64)
+    assert store.get('unknown') is None
+    a = store.get('A')
+    assert list(a.active_index) == [0, 2] and a.nbytes() == 32
+    store.get('B')
+    store.get('A')
+    store.get('C')
+    stats = store.stats()
+    assert stats['evictions'] == 1 and stats['resident_bytes'] <= 64
+    assert set(store.models) == set([registry.resolve('A'), registry.resolve('C')])
+    assert stats['hits'] == 1 and stats['misses'] == 3
+
+def test_oversized_model_is_still_served(registry, tmpdir):
+    """Test a single model over the budget stays resident."""
+    registry.register(write_artifacts(tmpdir.join('a.json'), [1.0] * 100), ['A'])
+    store = ModelStore(registry, memory_budget=10)
+    assert store.get('A') is store.get('A')
+
+def test_server_routes_segments(serve_model, monkeypatch, tmpdir):
+    """Test a request for a registered segment uses its model and unknown ones get 404."""
+    module, port = serve_model
+    registry = ModelRegistry(str(tmpdir.join('registry')))
+    registry.register(write_artifacts(tmpdir.join('a.json'), [0.0, 0.0, 0.0], 5.0), ['Sales'])
+    monkeypatch.setattr(module, 'store', ModelStore(registry))
+    response = http_request(port, 'POST', '/predict',
+                            json.dumps({'features': [1.0, 0.0, 0.0], 'segment': 'Sales'}))
+    assert response.startswith('HTTP/1.0 200')
+    assert json.loads(response.split('\r\n\r\n', 1)[1])['probability'] > 0.99
+    response = http_request(port, 'POST', '/predict',
+                            json.dumps({'features': [1.0, 0.0, 0.0], 'segment': 'HR'}))
+    assert response.startswith('HTTP/1.0 404')
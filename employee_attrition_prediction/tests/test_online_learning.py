@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from conftest import PY2
+
+if not PY2:
+    pytest.skip("online_learning.py is Python 2", allow_module_level=True)
+
+from online_learning import OnlineLearner
+from train_model import sgd_update
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not met")
+
+def test_max_step_bounds_each_coefficient_change():
+    """Test an unscaled feature cannot move its weight by more than max_step."""
+    coefficients = [0.0, 0.0]
+    intercept, _ = sgd_update(coefficients, 0.0, [5000.0, 0.01], 1, learning_rate=1.0,
+                              max_step=0.1)
+    assert coefficients[0] == pytest.approx(0.1)
+    assert 0.0 < coefficients[1] < 0.1 * 0.01 + 1e-12
+    assert intercept == pytest.approx(0.1)
+
+def test_unbounded_update_is_unchanged():
+    """Test without max_step the step multiplies each feature as before."""
+    coefficients = [0.0]
+    intercept, error = sgd_update(coefficients, 0.0, [2.0], 1, learning_rate=1.0)
+    assert error == 0.5
+    assert intercept == pytest.approx(0.125) and coefficients[0] == pytest.approx(0.25)
+
+def test_updates_are_published_at_swap_time():
+    """Test applied labels reach the live model through publish."""
+    published = []
+    learner = OnlineLearner([0.0, 0.0], 0.0, lambda c, b: published.append((c, b)),
+                            learning_rate=0.5, swap_seconds=0.05, rollback_threshold=10.0)
+    for _ in range(20):
+        assert learner.submit([1.0, 0.0], 1)
+    wait_for(lambda: learner.stats()['applied'] == 20 and published)
+    coefficients, intercept = published[-1]
+    assert coefficients[0] > 0.0 and coefficients[1] == 0.0 and intercept > 0.0
+
+def test_malformed_records_are_rejected():
+    """Test wrong-width vectors and non-binary labels are counted, not applied."""
+    learner = OnlineLearner([0.0, 0.0], 0.0, lambda c, b: None, swap_seconds=60)
+    learner.submit([1.0], 1)
+    learner.submit([1.0, 0.0], 2)
+    wait_for(lambda: learner.stats()['rejected'] == 2)
+    assert learner.stats()['applied'] == 0
+
+def test_worse_model_is_rolled_back():
+    """Test the baseline is republished when the shadow's loss exceeds it."""
+    published = []
+    learner = OnlineLearner([0.0], 0.0, lambda c, b: published.append((c, b)),
+                            learning_rate=100.0, max_step=None, swap_seconds=0.1,
+                            rollback_threshold=0.0)
+    # Alternating labels with a huge learning rate: every update overshoots
+    for i in range(20):
+        learner.submit([1.0], i % 2)
+    wait_for(lambda: learner.stats()['rollbacks'] >= 1)
+    assert published[-1] == ([0.0], 0.0)
+
+def test_full_queue_drops_records():
+    """Test records over max_pending are dropped and counted."""
+    learner = OnlineLearner([0.0], 0.0, lambda c, b: None, swap_seconds=60, max_pending=1)
+    learner.queue.put((['blocker'], 9))
+    assert not learner.submit([1.0], 1)
+    assert learner.stats()['dropped'] == 1
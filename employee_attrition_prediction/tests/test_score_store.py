@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from conftest import PY2, http_request, write_artifacts
+
+if not PY2:
+    pytest.skip("score_store.py is Python 2", allow_module_level=True)
+
+from score_store import ScoreStore
+
+ENCODER = {'columns': [{'name': 'AGE', 'kind': 'num'}], 'features': ['AGE']}
+
+@pytest.fixture
+def store(tmpdir):
+    return ScoreStore(str(tmpdir.join('scores.db')))
+
+@pytest.fixture
+def model(tmpdir):
+    return write_artifacts(tmpdir.join('model.json'), [0.05], -2.0, ENCODER)
+
+def extract(tmpdir, rows, name='extract.csv'):
+    path = tmpdir.join(name)
+    path.write('EMPLOYEE_ID,AGE\n' + ''.join('{},{}\n'.format(*row) for row in rows))
+    return str(path)
+
+def test_only_changed_employees_are_rescored(store, model, tmpdir):
+    """Test a second refresh rescores only edited rows and keeps the rest."""
+    first = extract(tmpdir, [('e1', 30), ('e2', 40), ('e3', 50)])
+    counts = store.refresh(first, model, 'EMPLOYEE_ID')
+    assert (counts['rescored'], counts['full_rescore']) == (3, True)
+    # Reordered and one age edited: only e2 changes
+    second = extract(tmpdir, [('e3', 50), ('e2', 60), ('e1', 30)], 'second.csv')
+    counts = store.refresh(second, model, 'EMPLOYEE_ID')
+    assert (counts['rescored'], counts['unchanged'], counts['full_rescore']) == (1, 2, False)
+    assert store.get('e2')['probability'] == pytest.approx(1 / (1 + 2.718281828 ** -1.0))
+
+def test_employees_missing_from_the_extract_are_deleted(store, model, tmpdir):
+    """Test ids absent from a new extract are removed from the store."""
+    store.refresh(extract(tmpdir, [('e1', 30), ('e2', 40), ('e3', 50)]), model, 'EMPLOYEE_ID')
+    counts = store.refresh(extract(tmpdir, [('e1', 30), ('e4', 45)], 'second.csv'), model,
+                           'EMPLOYEE_ID')
+    assert (counts['rescored'], counts['unchanged'], counts['deleted']) == (1, 1, 2)
+    assert store.count() == 2 and store.get('e2') is None and store.get('e4') is not None
+
+def test_new_model_version_rescores_everyone(store, model, tmpdir):
+    """Test changed artifacts force a full rescore."""
+    data = extract(tmpdir, [('e1', 30), ('e2', 40)])
+    store.refresh(data, model, 'EMPLOYEE_ID')
+    write_artifacts(model, [0.1], -2.0, ENCODER)
+    counts = store.refresh(data, model, 'EMPLOYEE_ID')
+    assert (counts['rescored'], counts['full_rescore']) == (2, True)
+
+@pytest.mark.parametrize('rows,id_column', [([('e1', 30)], 'MISSING'),
+                                            ([('e1', 30), ('e1', 40)], 'EMPLOYEE_ID')])
+def test_bad_id_columns_are_rejected(store, model, tmpdir, rows, id_column):
+    """Test a missing id column or duplicate ids raise ValueError."""
+    with pytest.raises(ValueError):
+        store.refresh(extract(tmpdir, rows), model, id_column)
+
+def test_row_ids_warn(store, model, tmpdir, capsys):
+    """Test refreshing without an id column keys by row number and warns."""
+    store.refresh(extract(tmpdir, [('e1', 30), ('e2', 40)]), model)
+    assert 'WARNING' in capsys.readouterr()[0]
+    assert store.get('1') is not None
+
+def test_server_serves_scores(serve_model, monkeypatch, store, model, tmpdir):
+    """Test GET /scores/<id> returns a stored record and 404 for unknown ids."""
+    module, port = serve_model
+    store.refresh(extract(tmpdir, [('e 1', 30)]), model, 'EMPLOYEE_ID')
+    monkeypatch.setattr(module, 'scores', store)
+    response = http_request(port, 'GET', '/scores/e%201')
+    assert response.startswith('HTTP/1.0 200')
+    assert json.loads(response.split('\r\n\r\n', 1)[1])['employee_id'] == 'e 1'
+    assert http_request(port, 'GET', '/scores/e2').startswith('HTTP/1.0 404')
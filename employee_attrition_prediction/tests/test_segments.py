@@ -0,0 +1,87 @@
+import array
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PY2, SRC_DIR
+
+if not PY2:
+    pytest.skip("train_model.py is Python 2", allow_module_level=True)
+
+from train_model import group_indices, train_segments
+
+COLUMN = 'EMPLOYEE_HIRE_WORK_CITY'
+
+def write_data(tmpdir, rename=None):
+    from generate_data import generate_dataset
+    headers, rows = generate_dataset(400)
+    position = headers.index(COLUMN)
+    for row in rows:
+        row[position] = (rename or {}).get(row[position], row[position])
+    with open(str(tmpdir.join('synthetic_attrition_data.csv')), 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+    return sorted(set(row[position] for row in rows))
+
+def train(tmpdir, *args):
+    process = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'train_model.py'),
+                                '--segment-by', COLUMN, '--segment-workers', '1',
+                                '--min-segment-rows', '1'] + list(args),
+                               cwd=str(tmpdir), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+    return process.returncode, output
+
+def test_group_indices_keeps_row_order():
+    """Test rows are grouped by key in the order of `indices`."""
+    groups = group_indices(array.array('l', [4, 0, 2, 3]), ['a', 'b', 'a', 'b', 'a'])
+    assert groups == {'a': array.array('l', [4, 0, 2]), 'b': array.array('l', [3])}
+
+def test_segment_models_do_not_depend_on_workers():
+    """Test each segment trains the same model serially and in a pool."""
+    data = [[0.1 * (i % 5), float(i % 3 == 0)] for i in range(60)]
+    segments = {'a': (array.array('l', range(0, 30)), array.array('l', range(30, 40))),
+                'b': (array.array('l', range(40, 60)), array.array('l'))}
+    serial = train_segments(data, segments, {'epochs': 3}, workers=1)
+    pooled = train_segments(data, segments, {'epochs': 3}, workers=2)
+    assert serial == pooled
+    assert [value for value, _, _ in serial] == ['a', 'b']
+    assert serial[1][2] is None
+
+def test_segment_run_writes_one_model_per_value(tmpdir):
+    """Test a segmented run exits cleanly with an artifact and index entry per value."""
+    values = write_data(tmpdir)
+    returncode, output = train(tmpdir)
+    assert returncode == 0, output
+    with open(str(tmpdir.join('segments', 'index.json'))) as f:
+        index = json.load(f)
+    assert sorted(index) == values
+    for value, entry in index.items():
+        with open(str(tmpdir.join(entry['artifacts']))) as f:
+            assert json.load(f)['segment'] == {'column': COLUMN, 'value': value}
+    assert not tmpdir.join('model_artifacts.json').check()
+
+def test_similar_segment_names_get_separate_files(tmpdir):
+    """Test "A/B" and "A B" are saved to different files."""
+    write_data(tmpdir, {'City_1': 'A/B', 'City_2': 'A B'})
+    returncode, output = train(tmpdir)
+    assert returncode == 0, output
+    with open(str(tmpdir.join('segments', 'index.json'))) as f:
+        index = json.load(f)
+    assert index['A/B']['artifacts'] != index['A B']['artifacts']
+    assert len(set(entry['artifacts'] for entry in index.values())) == len(index)
+
+def test_segment_named_index_keeps_the_index(tmpdir):
+    """Test a segment called "index" trains without clobbering index.json."""
+    values = write_data(tmpdir, {'City_1': 'index'})
+    returncode, output = train(tmpdir)
+    assert returncode == 0, output
+    with open(str(tmpdir.join('segments', 'index.json'))) as f:
+        index = json.load(f)
+    assert sorted(index) == values
+    with open(str(tmpdir.join(index['index']['artifacts']))) as f:
+        assert json.load(f)['segment'] == {'column': COLUMN, 'value': 'index'}
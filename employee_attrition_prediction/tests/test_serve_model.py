@@ -0,0 +1,18 @@
+import json
+
+from conftest import http_request
+
+class FailingShadow(object):
+    def submit(self, features, prob):
+        raise RuntimeError("candidate exploded")
+
+def test_shadow_failure_does_not_send_second_response(serve_model, monkeypatch):
+    """Test a shadow error after the 200 is written leaves the response alone."""
+    module, port = serve_model
+    monkeypatch.setattr(module, 'shadow', FailingShadow())
+    for path, body in [('/predict', {'features': [1.0, 2.0, 3.0]}),
+                       ('/predict/batch', {'rows': [[1.0, 2.0, 3.0]]})]:
+        response = http_request(port, 'POST', path, json.dumps(body),
+                                {'Content-Type': 'application/json'})
+        assert response.startswith('HTTP/1.0 200')
+        assert response.count('HTTP/1.0') == 1
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from conftest import PY2
+
+if not PY2:
+    pytest.skip("train_model.py is Python 2", allow_module_level=True)
+
+from train_model import split_indices
+
+LABELS = [1.0] * 300 + [0.0] * 700
+
+def test_split_is_a_seeded_partition():
+    """Test every row lands on exactly one side and the same seed gives the same split."""
+    train_idx, test_idx = split_indices(LABELS, 0.2, seed=5)
+    assert sorted(list(train_idx) + list(test_idx)) == range(len(LABELS))
+    assert split_indices(LABELS, 0.2, seed=5) == (train_idx, test_idx)
+    assert split_indices(LABELS, 0.2, seed=6) != (train_idx, test_idx)
+
+def test_split_is_stratified():
+    """Test both sides keep the overall attrition rate."""
+    train_idx, test_idx = split_indices(LABELS, 0.2, seed=5)
+    assert len(test_idx) == 200
+    assert sum(LABELS[i] for i in test_idx) == 60
+    assert sum(LABELS[i] for i in train_idx) == 240
+
+def test_grouped_split_keeps_groups_together():
+    """Test no group has rows on both sides and about test_size of the groups go to test."""
+    rng = random.Random(1)
+    groups = ['manager{}'.format(rng.randrange(50)) for _ in LABELS]
+    train_idx, test_idx = split_indices(LABELS, 0.2, seed=5, groups=groups)
+    train_groups = set(groups[i] for i in train_idx)
+    test_groups = set(groups[i] for i in test_idx)
+    assert not train_groups & test_groups
+    assert len(test_groups) == 10
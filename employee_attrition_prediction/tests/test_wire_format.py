@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from conftest import PY2, http_request
+
+if not PY2:
+    pytest.skip("wire_format.py is Python 2", allow_module_level=True)
+
+import wire_format
+from wire_format import (PayloadTooLarge, decode_rows, encode_probabilities, gunzip_bytes,
+                         gzip_bytes, pack_vectors, unpack_vectors, wants_binary)
+
+def test_vectors_round_trip():
+    """Test packed float64 and float32 rows unpack to the same values."""
+    rows = [[0.0, 1.5, -2.0], [3.25, 0.0, 1.0]]
+    assert [list(r) for r in unpack_vectors(pack_vectors(rows))] == rows
+    assert [list(r) for r in unpack_vectors(pack_vectors(rows, 'f'))] == rows
+
+@pytest.mark.parametrize('payload', ['', 'XX' + '\0' * 10, pack_vectors([[1.0, 2.0]])[:-4]])
+def test_malformed_payloads_are_rejected(payload):
+    """Test short, foreign and truncated payloads raise ValueError."""
+    with pytest.raises(ValueError):
+        unpack_vectors(payload)
+
+def test_ragged_rows_cannot_be_packed():
+    """Test rows of different widths are refused."""
+    with pytest.raises(ValueError):
+        pack_vectors([[1.0], [1.0, 2.0]])
+
+def test_gzip_round_trip_within_limit():
+    """Test a body inflating to exactly the limit is accepted."""
+    data = 'x' * 5000
+    assert gunzip_bytes(gzip_bytes(data)) == data
+    assert gunzip_bytes(gzip_bytes(data), max_bytes=5000) == data
+
+def test_gzip_bomb_is_refused():
+    """Test a small gzip body that inflates past the limit raises PayloadTooLarge."""
+    bomb = gzip_bytes('\0' * (10 * 1024 * 1024), level=9)
+    assert len(bomb) < 20 * 1024
+    with pytest.raises(PayloadTooLarge):
+        gunzip_bytes(bomb, max_bytes=1024 * 1024)
+    with pytest.raises(PayloadTooLarge):
+        decode_rows(bomb, 'application/json', 'gzip', max_bytes=1024 * 1024)
+
+def test_decode_rows_json_and_binary():
+    """Test JSON and binary request bodies decode to rows and a segment."""
+    body = json.dumps({'rows': [[1, 2]], 'segment': 'sales'})
+    assert decode_rows(gzip_bytes(body), 'application/json', 'gzip') == ([[1, 2]], 'sales')
+    rows, segment = decode_rows(pack_vectors([[1.0, 2.0]]), wire_format.BINARY_TYPE)
+    assert [list(r) for r in rows] == [[1.0, 2.0]] and segment is None
+    with pytest.raises(ValueError):
+        decode_rows(pack_vectors([[1.0], [2.0]]), wire_format.BINARY_TYPE, single=True)
+
+def test_negotiation():
+    """Test binary is used when asked for or by default for binary requests."""
+    assert wants_binary(wire_format.BINARY_TYPE, None)
+    assert wants_binary(None, wire_format.BINARY_TYPE)
+    assert not wants_binary('application/json', wire_format.BINARY_TYPE)
+    content_type, body = encode_probabilities([0.75], False)
+    assert json.loads(body)['predictions'] == [1]
+
+def test_server_answers_413_for_oversized_bodies(serve_model, monkeypatch):
+    """Test raw and inflated bodies over the request limit get a 413."""
+    module, port = serve_model
+    monkeypatch.setattr(module, 'max_request_bytes', 1024)
+    bomb = gzip_bytes(json.dumps({'rows': [[0.0] * 3] * 1000}))
+    response = http_request(port, 'POST', '/predict/batch', bomb,
+                            {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+    assert response.startswith('HTTP/1.0 413')
+    response = http_request(port, 'POST', '/predict', 'x' * 2000)
+    assert response.startswith('HTTP/1.0 413')
+    small = gzip_bytes(json.dumps({'features': [1.0, 0.0, 0.0]}))
+    response = http_request(port, 'POST', '/predict', small,
+                            {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+    assert response.startswith('HTTP/1.0 200')